@@ -0,0 +1,136 @@
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from corpus import call_id_from_path
+from labels import LABEL_COLS
+from search import tokenize
+
+FEATURE_DIMS = 2 ** 12  # Hashed token features per call
+TRAIN_STEPS = 200        # Gradient steps for the first fit
+UPDATE_STEPS = 40        # Gradient steps for warm-started refits after a save
+LEARNING_RATE = 0.5
+L2_PENALTY = 1e-3
+MODEL_LABELS = [label for label in LABEL_COLS if label != "none"]
+
+
+def hash_features(corpus_index, paths):
+    """L2-normalised log-tf * idf hashed bag of words of each call's Expected Outcome and Scope"""
+    counts = np.zeros((len(paths), FEATURE_DIMS), dtype=np.float32)
+    for row, path in enumerate(paths):
+        document = corpus_index.document(path)
+        for token in tokenize(f"{document.expected_outcome}\n{document.scope}"):
+            counts[row, zlib.crc32(token.encode()) % FEATURE_DIMS] += 1
+    doc_freq = (counts > 0).sum(axis=0)
+    idf = np.log((len(paths) + 1) / (doc_freq + 1)) + 1
+    features = np.log1p(counts) * idf
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.maximum(norms, 1e-9)
+
+
+_features_cache = (None, None, None)  # (corpus signature, paths, feature matrix) shared by all learners
+_features_lock = threading.Lock()
+
+
+def get_features(corpus_index):
+    """(paths, features) for every call in the corpus, computed once per corpus signature"""
+    global _features_cache
+    with _features_lock:
+        signature, paths, features = _features_cache
+        if signature != corpus_index.signature:
+            paths = [path for cluster in corpus_index.clusters for path in corpus_index.files[cluster]]
+            features = hash_features(corpus_index, paths)
+            _features_cache = (corpus_index.signature, paths, features)
+        return paths, features
+
+
+class ActiveLearner:
+    """Per-annotator multi-label logistic regression used to order calls by uncertainty.
+
+    Training runs on a single background thread; schedule_update() only
+    records the newest labels, so a burst of saves costs one refit. Each
+    finished fit bumps version, which the UI uses to re-rank its queue.
+    """
+
+    def __init__(self, corpus_index):
+        self.signature = corpus_index.signature
+        self.paths, self.features = get_features(corpus_index)
+        self.rows = {path: row for row, path in enumerate(self.paths)}
+        self.call_rows = {call_id_from_path(path): row for row, path in reversed(list(enumerate(self.paths)))}
+        self.weights = np.zeros((FEATURE_DIMS, len(MODEL_LABELS)), dtype=np.float32)
+        self.bias = np.zeros(len(MODEL_LABELS), dtype=np.float32)
+        self.version = 0
+        self._pending = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="active-learner")
+
+    def schedule_update(self, labels_dict):
+        """Refit on a snapshot of labels_dict in the background"""
+        snapshot = {call_id: dict(labels) for call_id, labels in labels_dict.items()}
+        with self._lock:
+            already_queued = self._pending is not None
+            self._pending = snapshot
+        if not already_queued:
+            self._executor.submit(self._train_pending)
+
+    def _train_pending(self):
+        with self._lock:
+            labels_dict, self._pending = self._pending, None
+        if labels_dict is not None:
+            self.fit(labels_dict)
+
+    def fit(self, labels_dict):
+        """Gradient descent on the labelled calls, warm-started from the current weights"""
+        rows, targets = [], []
+        for call_id, labels in labels_dict.items():
+            row = self.call_rows.get(call_id)
+            if row is not None and any(labels.get(col) == "yes" for col in LABEL_COLS):
+                rows.append(row)
+                targets.append([1.0 if labels.get(label) == "yes" else 0.0 for label in MODEL_LABELS])
+        if not rows:
+            return
+        x = self.features[rows]
+        y = np.asarray(targets, dtype=np.float32)
+        weights, bias = self.weights.copy(), self.bias.copy()
+        steps = TRAIN_STEPS if self.version == 0 else UPDATE_STEPS
+        for _ in range(steps):
+            p = 1 / (1 + np.exp(-(x @ weights + bias)))
+            error = (p - y) / len(rows)
+            weights -= LEARNING_RATE * (x.T @ error + L2_PENALTY * weights)
+            bias -= LEARNING_RATE * error.sum(axis=0)
+        self.weights, self.bias = weights, bias
+        self.version += 1
+
+    def uncertainty(self, paths):
+        """Summed binary entropy of the per-label predictions for each path"""
+        x = self.features[[self.rows[path] for path in paths]]
+        p = np.clip(1 / (1 + np.exp(-(x @ self.weights + self.bias))), 1e-6, 1 - 1e-6)
+        return -(p * np.log(p) + (1 - p) * np.log(1 - p)).sum(axis=1)
+
+    def rank(self, paths, labels_dict):
+        """Unlabelled paths most-uncertain first, then labelled ones in their given order"""
+        unlabelled = [path for path in paths if path in self.rows and call_id_from_path(path) not in labels_dict]
+        pending = set(unlabelled)
+        labelled = [path for path in paths if path not in pending]
+        if not unlabelled:
+            return labelled
+        scores = self.uncertainty(unlabelled)
+        # Stable sort keeps page order among equally uncertain calls (e.g. before any training)
+        order = np.argsort(-scores, kind="stable")
+        return [unlabelled[i] for i in order] + labelled
+
+
+_learners = {}  # username -> ActiveLearner
+_learners_lock = threading.Lock()
+
+
+def get_active_learner(username, corpus_index):
+    """Process-wide ActiveLearner per annotator, rebuilt when the corpus changes"""
+    with _learners_lock:
+        learner = _learners.get(username)
+        if learner is None or learner.signature != corpus_index.signature:
+            learner = ActiveLearner(corpus_index)
+            _learners[username] = learner
+        return learner
@@ -0,0 +1,162 @@
+import os
+import glob
+import threading
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from labels import LABEL_COLS, get_journal_path, load_labels
+
+
+def find_label_files(root_dir):
+    """{username: csv path} for every labels_<username>.csv (or journal only) in root_dir"""
+    files = {}
+    for path in glob.glob(os.path.join(root_dir, "labels_*.csv")) + glob.glob(os.path.join(root_dir, "labels_*.journal.jsonl")):
+        name = os.path.basename(path)
+        for suffix in (".journal.jsonl", ".csv"):
+            if name.endswith(suffix):
+                username = name[len("labels_"):-len(suffix)]
+                break
+        files.setdefault(username, os.path.join(root_dir, f"labels_{username}.csv"))
+    return files
+
+
+def label_files_stamp(files):
+    """Stat-only fingerprint of the label snapshots and their journals"""
+    stamp = []
+    for username, csv_path in sorted(files.items()):
+        for path in (csv_path, get_journal_path(csv_path)):
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                pass
+    return tuple(stamp)
+
+
+def cohen_kappa(a, b):
+    """Cohen's kappa of two boolean vectors (nan if undefined, e.g. both raters always said no)"""
+    n = len(a)
+    if n == 0:
+        return float("nan")
+    observed = np.mean(a == b)
+    pa, pb = a.mean(), b.mean()
+    expected = pa * pb + (1 - pa) * (1 - pb)
+    if expected == 1:
+        # A label nobody (or everybody) used says nothing about agreement
+        return float("nan")
+    return float((observed - expected) / (1 - expected))
+
+
+class AgreementReport:
+    """Agreement statistics over users x calls x labels.
+
+    labels[u, c, l] is True when user u set label l on call c and
+    rated[u, c] marks the calls user u labelled at all. Everything below is
+    computed with array operations on those two tensors.
+    """
+
+    def __init__(self, user_labels):
+        self.users = sorted(user_labels)
+        self.calls = sorted({call_id for labels in user_labels.values() for call_id in labels})
+        call_pos = {call_id: i for i, call_id in enumerate(self.calls)}
+        self.labels = np.zeros((len(self.users), len(self.calls), len(LABEL_COLS)), dtype=bool)
+        self.rated = np.zeros((len(self.users), len(self.calls)), dtype=bool)
+        for u, user in enumerate(self.users):
+            for call_id, values in user_labels[user].items():
+                row = [values.get(col) == "yes" for col in LABEL_COLS]
+                if any(row):
+                    c = call_pos[call_id]
+                    self.rated[u, c] = True
+                    self.labels[u, c] = row
+
+    @property
+    def raters_per_call(self):
+        return self.rated.sum(axis=0)
+
+    def fleiss_kappa(self):
+        """{label: Fleiss' kappa} over calls with at least two raters (yes/no per label, nan for unused labels)"""
+        n = self.raters_per_call
+        shared = n >= 2
+        result = {}
+        if not shared.any():
+            return {label: float("nan") for label in LABEL_COLS}
+        yes = (self.labels & self.rated[:, :, None]).sum(axis=0)[shared]  # calls x labels
+        n = n[shared][:, None]
+        no = n - yes
+        per_call = (yes * (yes - 1) + no * (no - 1)) / (n * (n - 1))
+        p_yes = yes.sum(axis=0) / n.sum()
+        observed = per_call.mean(axis=0)
+        expected = p_yes ** 2 + (1 - p_yes) ** 2
+        for i, label in enumerate(LABEL_COLS):
+            if expected[i] == 1:
+                result[label] = float("nan")
+            else:
+                result[label] = float((observed[i] - expected[i]) / (1 - expected[i]))
+        return result
+
+    def cohen_kappas(self):
+        """DataFrame: one row per pair of annotators, Cohen's kappa per label plus shared call count"""
+        rows = []
+        for a, b in combinations(range(len(self.users)), 2):
+            both = self.rated[a] & self.rated[b]
+            row = {"Annotators": f"{self.users[a]} / {self.users[b]}", "Shared calls": int(both.sum())}
+            for i, label in enumerate(LABEL_COLS):
+                row[label] = cohen_kappa(self.labels[a, both, i], self.labels[b, both, i])
+            rows.append(row)
+        return pd.DataFrame(rows, columns=["Annotators", "Shared calls"] + LABEL_COLS)
+
+    def confusion(self):
+        """DataFrame per label: annotator pairs that agree on yes, agree on no, or disagree.
+
+        With k of n raters saying yes on a call there are k(k-1)/2 yes/yes
+        pairs, (n-k)(n-k-1)/2 no/no pairs and k(n-k) disagreeing pairs.
+        """
+        n = self.raters_per_call[:, None]
+        yes = (self.labels & self.rated[:, :, None]).sum(axis=0)
+        no = n - yes
+        both_yes = (yes * (yes - 1) // 2).sum(axis=0)
+        both_no = (no * (no - 1) // 2).sum(axis=0)
+        disagree = (yes * no).sum(axis=0)
+        return pd.DataFrame({
+            "Label": LABEL_COLS,
+            "Both yes": both_yes.astype(int),
+            "Both no": both_no.astype(int),
+            "Disagree": disagree.astype(int),
+        })
+
+    def disagreements(self, limit=20):
+        """DataFrame of the calls with the most split labels among their raters"""
+        n = self.raters_per_call
+        yes = (self.labels & self.rated[:, :, None]).sum(axis=0)
+        split = (yes > 0) & (yes < n[:, None]) & (n[:, None] >= 2)
+        score = split.sum(axis=1)
+        order = np.argsort(-score, kind="stable")
+        rows = []
+        for c in order[:limit]:
+            if score[c] == 0:
+                break
+            rows.append({
+                "CallID": self.calls[c],
+                "Raters": int(n[c]),
+                "Split labels": ", ".join(label for i, label in enumerate(LABEL_COLS) if split[c, i]),
+            })
+        return pd.DataFrame(rows, columns=["CallID", "Raters", "Split labels"])
+
+
+_report_cache = (None, None)  # (label files stamp, AgreementReport)
+_report_lock = threading.Lock()
+
+
+def get_agreement_report(root_dir):
+    """AgreementReport over every labels_*.csv in root_dir, rebuilt only when one of them changes"""
+    global _report_cache
+    files = find_label_files(root_dir)
+    stamp = label_files_stamp(files)
+    with _report_lock:
+        if _report_cache[0] == stamp:
+            return _report_cache[1]
+        report = AgreementReport({username: load_labels(csv_path) for username, csv_path in files.items()})
+        _report_cache = (stamp, report)
+        return report
@@ -1,141 +1,285 @@
 import streamlit as st
 import os
-import glob
-import re
-import pandas as pd
+
+from corpus import CLUSTERS, call_id_from_path, get_corpus_index
+from labels import LABEL_COLS, CsvLabelStore, get_label_writer, get_sqlite_store
+from search import get_search_index
+from highlight import get_highlighter
+from prelabel import SUGGESTIONS_FILE, load_suggestions
+from snapshot import SNAPSHOT_FILE
+from active import get_active_learner
+from agreement import get_agreement_report
+from progress import LABELLED_MARK, UNLABELLED_MARK, PendingCalls, ProgressOverview
+from metadata import TYPES_OF_ACTION, get_metadata_table
 
 st.set_page_config(layout="wide", page_title="Final Output Labeler")
 
 ROOT = os.getcwd()
 FINAL_OUTPUT_DIR = os.path.join(ROOT, "final_output_2")
-CLUSTERS = ["health", "civil", "climate", "culture", "digital", "food"]
-LABEL_COLS = ["NLP", "WUDAP", "ETHICS", "ENVIRO", "OPERATIONS", "none"]
-
-def get_full_call_names(divide_file_path):
-    """Parse divide_cluster file to map call_ids to their full names (with description)."""
-    call_name_map = {}
-    try:
-        with open(divide_file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith("HORIZON-"):
-                    # Extract call_id and full name (everything before the last sequence of dots and a number)
-                    match = re.match(r'^(HORIZON-[^:]+):\s*(.*?)(?:\.+\s+\d+)?\s*$', line)
-                    if match:
-                        call_id = match.group(1)
-                        desc = match.group(2).rstrip('. ').strip()
-                        call_name_map[call_id] = f"{call_id}: {desc}" if desc else call_id
-    except Exception:
-        pass
-    return call_name_map
-
-def extract_after_expected_outcome_for_file(file_path):
-    """Extract text after 'Expected Outcome' (including the line) from a single file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            found = False
-            lines = []
-            for line in f:
-                if not found and 'Expected Outcome' in line:
-                    found = True
-                    lines.append(line)  # Include the line itself
-                    continue
-                if found:
-                    lines.append(line)
-        return ''.join(lines)
-    except Exception as e:
-        return f"[Error extracting content: {e}]"
+LABEL_BACKEND = os.environ.get("LABEL_BACKEND", "csv")  # "csv" or "sqlite"
+LABEL_DB_PATH = os.path.join(ROOT, "labels.sqlite3")
+SEARCH_RESULTS = 10
+SUGGESTIONS_PATH = os.path.join(ROOT, SUGGESTIONS_FILE)  # Written by prelabel.py
+SNAPSHOT_PATH = os.path.join(ROOT, SNAPSHOT_FILE)  # Optional pack written by snapshot.py
+ORDER_PAGE = "Page order"
+ORDER_UNCERTAIN = "Most uncertain first"
+SAVE_STATUS_POLL = 1.0  # Seconds between refreshes of the "saved" indicator
+LABEL_SHORTCUTS = [str(i + 1) for i in range(len(LABEL_COLS))]  # 1-6 toggle the labels
+NEXT_SHORTCUT = "J"
+PREV_SHORTCUT = "K"
+VIEW_LABEL = "Label calls"
+VIEW_PROGRESS = "Progress"
+VIEW_AGREEMENT = "Agreement"
+BUDGET_STEP = 1.0  # EUR million
 
 def get_user_csv_path(username):
     """Get user-specific CSV path"""
     return os.path.join(ROOT, f"labels_{username}.csv")
 
 
-def load_labels(csv_path):
-    """Load existing labels from CSV"""
-    if os.path.exists(csv_path):
-        df = pd.read_csv(csv_path)
-        # Create dict with CallID as key and dict of labels as value
-        result = {}
-        for _, row in df.iterrows():
-            call_id = row.get("CallID")
-            if call_id:
-                result[call_id] = {col: row.get(col, "") for col in LABEL_COLS}
-        return result
-    return {}
-
-
-def save_labels(csv_path, labels_dict):
-    """Save labels to CSV"""
-    rows = []
-    for call_id, label_dict in sorted(labels_dict.items()):
-        row = {"CallID": call_id}
-        for col in LABEL_COLS:
-            row[col] = label_dict.get(col, "")
-        rows.append(row)
-    
-    df = pd.DataFrame(rows)
-    df.to_csv(csv_path, index=False)
-
-
-def extract_page_number(divide_file_path, call_id):
-    """Extract page number for a call_id from the divide file"""
-    try:
-        with open(divide_file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith(call_id):
-                    # Extract page number at the end of the line
-                    match = re.search(r'(\d+)$', line)
-                    if match:
-                        return int(match.group(1))
-    except Exception:
-        pass
-    return 10**9  # Return large number if not found
-
-
-def get_sorted_files(cluster_dir, cluster, root_dir):
-    """Get files sorted by page number from divide file"""
-    txt_files = glob.glob(os.path.join(cluster_dir, "*.txt"))
-    divide_file_path = os.path.join(root_dir, cluster, f"divide_{cluster}.txt")
-    
-    if not os.path.exists(divide_file_path):
-        # Fallback to alphabetical sorting
-        return sorted(txt_files)
-    
-    # Sort by page number
-    def get_page_sort_key(file_path):
-        fname = os.path.basename(file_path)
-        call_id = fname.replace(".txt", "")
-        page_num = extract_page_number(divide_file_path, call_id)
-        return (page_num, fname)
-    
-    return sorted(txt_files, key=get_page_sort_key)
-
-
-def get_destination_mapping(divide_file_path):
-    """Parse divide file to map call_ids to their destinations"""
-    destination_map = {}
-    try:
-        with open(divide_file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        last_non_horizon = None
-        for line in lines:
-            stripped = line.strip()
-            if not stripped:
-                continue
-            if stripped.startswith("HORIZON-"):
-                match = re.match(r'^(HORIZON-[^:]+):', stripped)
-                if match and last_non_horizon:
-                    call_id = match.group(1)
-                    # Remove trailing dots and page numbers
-                    dest = re.sub(r'\.+\s*\d+$', '', last_non_horizon).strip()
-                    destination_map[call_id] = dest
-            else:
-                last_non_horizon = stripped
-    except Exception:
-        pass
-    return destination_map
+def get_label_store(username):
+    """Label store for the configured LABEL_BACKEND"""
+    if LABEL_BACKEND == "sqlite":
+        return get_sqlite_store(LABEL_DB_PATH, username)
+    return CsvLabelStore(get_user_csv_path(username))
+
+
+def request_jump(cluster, file_path):
+    """Show another call: widgets can only be moved before they are drawn, so rerun first"""
+    st.session_state.pending_jump = (cluster, file_path)
+    st.rerun()
+
+
+def save_call_labels(call_id):
+    """Queue one call's labels for the background writer and let the active learner (if in use) refit"""
+    get_label_writer().submit(st.session_state.label_store, st.session_state.labels_dict, call_id)
+    st.session_state.labels_submitted = True
+    pending_calls = st.session_state.get("pending_calls")
+    if pending_calls is not None:
+        pending_calls.update(call_id, st.session_state.labels_dict.get(call_id))
+    learner = st.session_state.get("active_learner")
+    if learner is not None:
+        learner.schedule_update(st.session_state.labels_dict)
+
+
+def toggle_label(call_id, label):
+    """Label button callback, run before the rerun so a click or shortcut costs a single run"""
+    current_labels = dict(st.session_state.labels_dict.get(call_id, {col: "" for col in LABEL_COLS}))
+    if current_labels.get(label) == "yes":
+        # Deselecting
+        current_labels[label] = ""
+    elif label == "none":
+        # If selecting "none", clear all others
+        current_labels = {col: "" for col in LABEL_COLS}
+        current_labels["none"] = "yes"
+    else:
+        # If selecting any other label, remove "none"
+        current_labels["none"] = ""
+        current_labels[label] = "yes"
+    st.session_state.labels_dict[call_id] = current_labels
+    save_call_labels(call_id)
+
+
+def accept_suggestions(call_id, suggested):
+    """Accept suggestions button callback"""
+    st.session_state.labels_dict[call_id] = {col: "yes" if col in suggested else "" for col in LABEL_COLS}
+    save_call_labels(call_id)
+
+
+def get_suggested_labels(call_id):
+    """Offline suggestions (prelabel.py) for a call, shown until the call has confirmed labels"""
+    if call_id in st.session_state.labels_dict:
+        return []
+    suggestion = load_suggestions(SUGGESTIONS_PATH).get(call_id, {})
+    return [label for label in LABEL_COLS if suggestion.get(label) == "yes"]
+
+
+def step_call(delta, num_files):
+    """Prev/Next callback: move the slider before it is drawn"""
+    st.session_state.cluster_index = min(max(st.session_state.cluster_index + delta, 0), num_files - 1)
+
+
+def get_pending_calls(corpus_index):
+    """The session's PendingCalls, rebuilt from labels_dict when the corpus changes"""
+    pending_calls = st.session_state.get("pending_calls")
+    if pending_calls is None or pending_calls.signature != corpus_index.signature:
+        pending_calls = PendingCalls(corpus_index, st.session_state.labels_dict)
+        st.session_state.pending_calls = pending_calls
+    return pending_calls
+
+
+def go_to_next_unlabelled(cluster, txt_files, page_files):
+    """Button callback: move the slider to the next unlabelled call in page order before it is drawn"""
+    pending_calls = st.session_state.pending_calls
+    _, position = pending_calls.path_positions[txt_files[st.session_state.cluster_index]]
+    if txt_files is page_files:
+        next_position = pending_calls.next_after(cluster, position)
+        if next_position is not None:
+            st.session_state.cluster_index = next_position
+        return
+    # Queue order or filtered: skip pending calls the filters hide
+    indexes = {path: i for i, path in enumerate(txt_files)}
+    for _ in range(pending_calls.count(cluster)):
+        position = pending_calls.next_after(cluster, position)
+        i = indexes.get(page_files[position])
+        if i is not None:
+            st.session_state.cluster_index = i
+            return
+
+
+def get_uncertainty_queue(username, corpus_index, cluster, page_files):
+    """Cluster files ordered by the annotator's active learner.
+
+    The queue is kept in the session and re-ranked whenever the learner
+    finishes a refit; calls up to the one on screen keep their place so it
+    does not move. That call is found by identity: with filters on, the
+    slider index points into the filtered list, not into the queue.
+    """
+    learner = get_active_learner(username, corpus_index)
+    if st.session_state.get("active_learner") is not learner:
+        st.session_state.active_learner = learner
+        learner.schedule_update(st.session_state.labels_dict)
+    queues = st.session_state.setdefault("active_queues", {})
+    queue = queues.get(cluster)
+    if queue is None or queue[0] != learner.version:
+        head = []
+        if queue is not None and st.session_state.get("last_cluster") == cluster:
+            page_set = set(page_files)
+            current = [i for i, path in enumerate(queue[1]) if call_id_from_path(path) == st.session_state.last_call_id]
+            head = [path for path in queue[1][:current[0] + 1 if current else 0] if path in page_set]
+        head_set = set(head)
+        tail = [path for path in page_files if path not in head_set]
+        queue = (learner.version, head + learner.rank(tail, st.session_state.labels_dict))
+        queues[cluster] = queue
+    return queue[1]
+
+
+def render_agreement_dashboard(corpus_index):
+    """Inter-annotator agreement over every labels_*.csv next to the app"""
+    report = get_agreement_report(ROOT)
+    st.header("Inter-annotator agreement")
+    if len(report.users) < 2:
+        st.info("Agreement needs label files from at least two annotators.")
+        return
+    st.caption(f"{len(report.users)} annotators, {len(report.calls)} labelled calls")
+
+    kappas = report.fleiss_kappa()
+    cols = st.columns(len(LABEL_COLS))
+    for col, label in zip(cols, LABEL_COLS):
+        kappa = kappas[label]
+        col.metric(f"{label} (Fleiss' κ)", "n/a" if kappa != kappa else f"{kappa:.2f}")
+
+    st.subheader("Cohen's κ per annotator pair")
+    st.dataframe(report.cohen_kappas().round(2), hide_index=True)
+    st.subheader("Pair agreement per label")
+    st.dataframe(report.confusion(), hide_index=True)
+
+    st.subheader("Calls with the most disagreement")
+    for row in report.disagreements().itertuples(index=False):
+        col1, col2 = st.columns([4, 1])
+        col1.write(f"**{row.CallID}** ({row.Raters} annotators): {row[2]}")
+        location = corpus_index.locations.get(row.CallID)
+        if location and col2.button("Open", key=f"agreement_{row.CallID}"):
+            request_jump(*location)
+
+
+def open_matrix_cell(corpus_index, clusters):
+    """Status matrix callback: jump to the call in the selected cell"""
+    cells = st.session_state.progress_matrix.selection.cells
+    if cells:
+        row, column = cells[0]
+        files = corpus_index.files[clusters[row]]
+        position = int(column) - 1
+        if position < len(files):
+            st.session_state.pending_jump = (clusters[row], files[position])
+
+
+def render_progress_overview(corpus_index, overview, pending_calls):
+    """Labelled vs unlabelled calls for every cluster, from the in-memory labels only"""
+    st.header("Labelling progress")
+    st.dataframe(overview.cluster_table(), hide_index=True)
+    with st.expander("Per destination"):
+        st.dataframe(overview.destination_table(), hide_index=True)
+
+    st.subheader("Next unlabelled call")
+    cols = st.columns(len(overview.clusters))
+    for col, cluster in zip(cols, overview.clusters):
+        position = pending_calls.next_after(cluster)
+        col.caption(f"{cluster}: {overview.labelled(cluster)} / {len(overview.status[cluster])}")
+        if position is not None and col.button(cluster, key=f"progress_next_{cluster}", use_container_width=True):
+            request_jump(cluster, corpus_index.files[cluster][position])
+
+    st.subheader("Call status")
+    st.caption(f"{LABELLED_MARK} labelled, {UNLABELLED_MARK} unlabelled; select a cell to open the call (columns are page order)")
+    st.dataframe(
+        overview.status_matrix(),
+        key="progress_matrix",
+        on_select=lambda: open_matrix_cell(corpus_index, overview.clusters),
+        selection_mode="single-cell",
+    )
+
+
+@st.fragment
+def render_label_panel(call_id, keyword_hits):
+    """Label buttons, suggestions and the current labels of one call.
+
+    Runs as a fragment, so a click or shortcut here re-renders only this
+    panel; the call text, headers and sidebar are left as they are.
+    """
+    st.divider()
+    st.subheader("Labels")
+
+    # Get current labels for this call_id
+    current_labels = st.session_state.labels_dict.get(call_id, {col: "" for col in LABEL_COLS})
+
+    suggested = get_suggested_labels(call_id)
+    if suggested:
+        st.caption(f"Suggested, not confirmed: {', '.join(suggested)}")
+        st.button("Accept suggestions", key=f"accept_{call_id}", on_click=accept_suggestions, args=(call_id, suggested))
+
+    # Display label buttons in columns
+    cols = st.columns(len(LABEL_COLS))
+    for i, label in enumerate(LABEL_COLS):
+        is_active = current_labels.get(label) == "yes"
+        if is_active:
+            btn_label = f"✅ {label}"
+        elif label in suggested:
+            btn_label = f"💡 {label}"
+        else:
+            btn_label = f"⬜ {label}"
+
+        # Keys 1-6 press the buttons; the save (journal append or SQLite upsert) runs in the background
+        cols[i].button(btn_label, key=f"btn_{call_id}_{label}", on_click=toggle_label, args=(call_id, label),
+                       shortcut=LABEL_SHORTCUTS[i])
+        if keyword_hits[label]:
+            cols[i].caption(f"{keyword_hits[label]} keyword hit{'s' if keyword_hits[label] != 1 else ''}")
+
+    # Display current labels
+    st.write("**Current labels:**")
+    active_labels = [label for label in LABEL_COLS if current_labels.get(label) == "yes"]
+    if active_labels:
+        st.write(", ".join(active_labels))
+    else:
+        st.write("(none)")
+
+    # Polls only while a write is pending or failing, so idle tabs do not rerun every second
+    saving, error = get_label_writer().status(st.session_state.label_store)
+    polling = saving or error is not None
+    st.fragment(render_save_status, run_every=SAVE_STATUS_POLL if polling else None)(polling)
+
+
+def render_save_status(polling):
+    """Whether this annotator's label changes are on disk; a fragment inside the label panel"""
+    saving, error = get_label_writer().status(st.session_state.label_store)
+    if error is not None:
+        st.error(f"Saving labels failed, retrying: {error}")
+    elif saving:
+        st.caption("Saving…")
+    elif polling:
+        # The write landed: rerun once so the panel registers this fragment without run_every
+        st.rerun()
+    elif st.session_state.get("labels_submitted"):
+        st.caption("✓ All labels saved")
 
 
 def main():
@@ -152,18 +296,51 @@ def main():
     csv_path = get_user_csv_path(username)
 
     # Initialize session state
+    if "label_store" not in st.session_state:
+        st.session_state.label_store = get_label_store(username)
     if "labels_dict" not in st.session_state:
-        st.session_state.labels_dict = load_labels(csv_path)
+        # CSV backend: snapshot plus journal replay, the journal is folded into the CSV here
+        st.session_state.labels_dict = st.session_state.label_store.load()
     if "viewed_calls" not in st.session_state:
         st.session_state.viewed_calls = set()
     if "last_call_id" not in st.session_state:
         st.session_state.last_call_id = None
-    if "destination_map" not in st.session_state:
-        st.session_state.destination_map = {}
+
+    pending_jump = st.session_state.pop("pending_jump", None)
+    if pending_jump:
+        st.session_state.cluster_select = pending_jump[0]
+        st.session_state.view = VIEW_LABEL
+
+    # Corpus index is built once per process (from the snapshot pack if there is one) and only rebuilt when files change
+    corpus_index = get_corpus_index(FINAL_OUTPUT_DIR, CLUSTERS, SNAPSHOT_PATH)
+    # Budget, type of action and call name of every call as columns, built once per corpus signature
+    metadata_table = get_metadata_table(corpus_index)
+    if pending_jump and pending_jump[1] not in metadata_table.filter(st.session_state.get("action_filter"),
+                                                                     st.session_state.get("min_budget")):
+        # Search hits and matrix cells open even when the filters would hide them
+        st.session_state.action_filter = []
+        st.session_state.min_budget = 0.0
+
+    view = st.sidebar.radio("View", [VIEW_LABEL, VIEW_PROGRESS, VIEW_AGREEMENT], key="view", horizontal=True)
+    if view == VIEW_PROGRESS:
+        overview = ProgressOverview(corpus_index, st.session_state.labels_dict)
+        render_progress_overview(corpus_index, overview, get_pending_calls(corpus_index))
+        st.stop()
+    if view == VIEW_AGREEMENT:
+        render_agreement_dashboard(corpus_index)
+        st.stop()
 
     # Sidebar: cluster selection
     st.sidebar.header("Navigation")
-    selected_cluster = st.sidebar.selectbox("Select Cluster", CLUSTERS)
+    selected_cluster = st.sidebar.selectbox("Select Cluster", CLUSTERS, key="cluster_select")
+    order_mode = st.sidebar.radio("Order", [ORDER_PAGE, ORDER_UNCERTAIN], key="order_mode", horizontal=True)
+    action_counts = metadata_table.action_counts()
+    action_filter = st.sidebar.multiselect("Type of action", list(action_counts), key="action_filter",
+                                           format_func=lambda code: f"{code} ({action_counts[code]})",
+                                           help=", ".join(f"{code}: {name}" for code, name in TYPES_OF_ACTION.items()))
+    min_budget = st.sidebar.number_input("Min. topic budget (EUR million)", min_value=0.0, step=BUDGET_STEP,
+                                         key="min_budget")
+    filters = (tuple(action_filter), min_budget)
     
     cluster_dir = os.path.join(FINAL_OUTPUT_DIR, selected_cluster)
     
@@ -171,47 +348,83 @@ def main():
         st.error(f"Cluster directory not found: {cluster_dir}")
         st.stop()
     
-    # Get all txt files in the cluster, sorted by page number from divide file
-    txt_files = get_sorted_files(cluster_dir, selected_cluster, FINAL_OUTPUT_DIR)
-    
-    # Load destination mapping and full call names for this cluster
-    divide_file_path = os.path.join(FINAL_OUTPUT_DIR, selected_cluster, f"divide_{selected_cluster}.txt")
-    st.session_state.destination_map = get_destination_mapping(divide_file_path)
-    call_name_map = get_full_call_names(divide_file_path)
+    # All txt files in the cluster, sorted by page number from divide file or by model uncertainty
+    page_files = txt_files = corpus_index.files[selected_cluster]
+    if order_mode == ORDER_UNCERTAIN and txt_files:
+        txt_files = get_uncertainty_queue(username, corpus_index, selected_cluster, txt_files)
+    filtered = bool(action_filter or min_budget)
+    if filtered:
+        matches = metadata_table.filter(action_filter, min_budget)
+        txt_files = [path for path in txt_files if path in matches]
+        st.sidebar.caption(f"{len(matches)} calls match across all clusters")
+
+    # Destination mapping and full call names for this cluster, shared by all sessions
+    destination_map = corpus_index.destinations[selected_cluster]
+    call_name_map = corpus_index.call_names[selected_cluster]
     if not txt_files:
-        st.warning(f"No txt files found in {selected_cluster}/")
+        if filtered:
+            st.warning(f"No calls in {selected_cluster} match the filters")
+        else:
+            st.warning(f"No txt files found in {selected_cluster}/")
         st.stop()
     
     # State tracking
-    if "cluster_index" not in st.session_state or st.session_state.get("last_cluster") != selected_cluster:
+    if pending_jump and pending_jump[1] in txt_files:
+        st.session_state.cluster_index = txt_files.index(pending_jump[1])
+        st.session_state.last_cluster = selected_cluster
+    elif "cluster_index" not in st.session_state or st.session_state.get("last_cluster") != selected_cluster:
         st.session_state.cluster_index = 0
         st.session_state.last_cluster = selected_cluster
+    elif st.session_state.get("last_order_mode", order_mode) != order_mode:
+        # The queue starts at its most uncertain call; back in page order keep the same call
+        positions = {call_id_from_path(path): i for i, path in enumerate(txt_files)}
+        st.session_state.cluster_index = 0 if order_mode == ORDER_UNCERTAIN else positions.get(st.session_state.last_call_id, 0)
+    elif st.session_state.get("last_filters", filters) != filters:
+        # Stay on the same call if it still matches
+        positions = {call_id_from_path(path): i for i, path in enumerate(txt_files)}
+        st.session_state.cluster_index = positions.get(st.session_state.last_call_id, 0)
+    st.session_state.last_order_mode = order_mode
+    st.session_state.last_filters = filters
 
     num_files = len(txt_files)
-    idx = st.sidebar.slider("File", 0, num_files - 1, st.session_state.cluster_index)
+    # A slider needs two positions; the filters can leave a single call
+    idx = st.sidebar.slider("File", 0, num_files - 1, st.session_state.cluster_index) if num_files > 1 else 0
     st.session_state.cluster_index = idx
 
     # Navigation buttons
     col_nav1, col_nav2 = st.sidebar.columns(2)
-    if col_nav1.button("⬅ Prev") and st.session_state.cluster_index > 0:
-        st.session_state.cluster_index -= 1
-        st.rerun()
-    if col_nav2.button("Next ➡") and st.session_state.cluster_index < num_files - 1:
-        st.session_state.cluster_index += 1
-        st.rerun()
+    col_nav1.button("⬅ Prev", on_click=step_call, args=(-1, num_files), shortcut=PREV_SHORTCUT)
+    col_nav2.button("Next ➡", on_click=step_call, args=(1, num_files), shortcut=NEXT_SHORTCUT)
+    # Filled in with the progress lines, once the auto-save below has updated the pending calls
+    next_unlabelled_box = st.sidebar.empty()
+
+    # Full-text search over all clusters; a result jumps straight to the call
+    query = st.sidebar.text_input("Search calls", key="search_query", placeholder='e.g. "large language model"')
+    if query:
+        hits = get_search_index(corpus_index).search(query, limit=SEARCH_RESULTS)
+        if not hits:
+            st.sidebar.caption("No matching calls")
+        for hit in hits:
+            title = corpus_index.call_names[hit.cluster].get(hit.call_id, hit.call_id)
+            if st.sidebar.button(hit.call_id, key=f"search_{hit.call_id}", help=title, use_container_width=True):
+                request_jump(hit.cluster, hit.path)
 
     st.sidebar.divider()
-    st.sidebar.write(f"**Progress:** {st.session_state.cluster_index + 1} / {num_files}")
-    st.sidebar.write(f"**Cluster:** {selected_cluster}")
+    # Filled in once this run's auto-save (below) has updated the labels
+    progress_box = st.sidebar.container()
+    if LABEL_BACKEND == "sqlite" and st.sidebar.button("Export labels CSV"):
+        st.session_state.label_store.export_csv(csv_path, st.session_state.labels_dict)
+        st.sidebar.success(f"Exported to {os.path.basename(csv_path)}")
 
     # Current file
     current_path = txt_files[st.session_state.cluster_index]
-    fname = os.path.basename(current_path)
-    call_id = fname.replace(".txt", "")
+    call_id = call_id_from_path(current_path)
 
-    # Auto-default previous call to "none" if viewed but not labeled
+    # Auto-default previous call to "none" if viewed but not labeled; calls with
+    # suggestions stay pre-filled and unconfirmed instead of getting an answer nobody gave
     if st.session_state.last_call_id and st.session_state.last_call_id != call_id:
-        if st.session_state.last_call_id in st.session_state.viewed_calls:
+        if (st.session_state.last_call_id in st.session_state.viewed_calls
+                and not get_suggested_labels(st.session_state.last_call_id)):
             prev_labels = st.session_state.labels_dict.get(st.session_state.last_call_id, {col: "" for col in LABEL_COLS})
             # Check if any label (except "none") is set
             has_labels = any(prev_labels.get(col) == "yes" for col in LABEL_COLS[:-1])
@@ -220,7 +433,17 @@ def main():
                 prev_labels = {col: "" for col in LABEL_COLS}
                 prev_labels["none"] = "yes"
                 st.session_state.labels_dict[st.session_state.last_call_id] = prev_labels
-                save_labels(csv_path, st.session_state.labels_dict)
+                save_call_labels(st.session_state.last_call_id)
+
+    # Only the calls the filters let through count towards the sidebar progress
+    pending_calls = get_pending_calls(corpus_index)
+    pending_count = pending_calls.count(selected_cluster, txt_files if filtered else None)
+    next_unlabelled_box.button("Next unlabelled ⏭", on_click=go_to_next_unlabelled,
+                               args=(selected_cluster, txt_files, page_files), disabled=pending_count == 0,
+                               use_container_width=True)
+    progress_box.write(f"**Position:** {st.session_state.cluster_index + 1} / {num_files}")
+    progress_box.write(f"**Labelled:** {num_files - pending_count} / {num_files}")
+    progress_box.write(f"**Cluster:** {selected_cluster}")
 
     # Mark this call as viewed
     st.session_state.viewed_calls.add(call_id)
@@ -231,71 +454,30 @@ def main():
     st.header(full_call_name)  # Show full call name as main header
 
     # Get destination for this call_id and display as subheader if available
-    destination = st.session_state.destination_map.get(call_id, "")
+    destination = destination_map.get(call_id, "")
     if destination:
         st.subheader(f"Destination: {destination}")
-
-    # Load text after and before 'Expected Outcome' from the file
-    content_after = extract_after_expected_outcome_for_file(current_path)
-    def extract_before_expected_outcome_for_file(file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = []
-                for line in f:
-                    if 'Expected Outcome' in line:
-                        break
-                    lines.append(line)
-            return ''.join(lines)
-        except Exception as e:
-            return f"[Error extracting content: {e}]"
-    content_before = extract_before_expected_outcome_for_file(current_path)
+    call_summary = metadata_table.records[current_path].summary()
+    if call_summary:
+        st.caption(call_summary)
+
+    # Show only the sections annotators label from, parsed once per file
+    document = corpus_index.document(current_path)
+    # Label keywords are matched in one pass per section and highlighted (cached per text)
+    highlighter = get_highlighter(ROOT)
+    outcome_html, outcome_hits = highlighter.highlight(document.expected_outcome)
+    scope_html, scope_hits = highlighter.highlight(document.scope)
+    keyword_hits = {label: outcome_hits.get(label, 0) + scope_hits.get(label, 0) for label in LABEL_COLS}
     col1, col2 = st.columns(2)
-    col1.text_area("File Content (after 'Expected Outcome')", content_after, height=600, disabled=True)
-    col2.text_area("File Content (before 'Expected Outcome')", content_before, height=600, disabled=True)
-
-    # Labeling section
-    st.divider()
-    st.subheader("Labels")
-
-    # Get current labels for this call_id
-    current_labels = st.session_state.labels_dict.get(call_id, {col: "" for col in LABEL_COLS})
-
-    # Display label buttons in columns
-    cols = st.columns(len(LABEL_COLS))
-    for i, label in enumerate(LABEL_COLS):
-        is_active = current_labels.get(label) == "yes"
-        btn_label = f"✅ {label}" if is_active else f"⬜ {label}"
-
-        if cols[i].button(btn_label, key=f"btn_{call_id}_{label}"):
-            # Toggle logic
-            if is_active:
-                # Deselecting
-                current_labels[label] = ""
-            else:
-                # Selecting
-                if label == "none":
-                    # If selecting "none", clear all others
-                    current_labels = {col: "" for col in LABEL_COLS}
-                    current_labels["none"] = "yes"
-                else:
-                    # If selecting any other label, remove "none"
-                    if current_labels.get("none") == "yes":
-                        current_labels["none"] = ""
-                    current_labels[label] = "yes"
-            
-            # Auto-save
-            st.session_state.labels_dict[call_id] = current_labels
-            save_labels(csv_path, st.session_state.labels_dict)
-            st.rerun()
-
-    # Display current labels
-    st.write("**Current labels:**")
-    active_labels = [label for label in LABEL_COLS if current_labels.get(label) == "yes"]
-    if active_labels:
-        st.write(", ".join(active_labels))
-    else:
-        st.write("(none)")
-
+    col1.markdown("**Expected Outcome**")
+    col1.container(height=600).html(outcome_html)
+    col2.markdown("**Scope**")
+    col2.container(height=600).html(scope_html)
+    # Warm the neighbouring calls while the annotator reads this one
+    corpus_index.prefetch(txt_files, st.session_state.cluster_index)
+
+    # Labeling section (a fragment: toggling a label reruns only the panel)
+    render_label_panel(call_id, keyword_hits)
 
 if __name__ == "__main__":
     main()
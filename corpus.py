@@ -0,0 +1,705 @@
+import os
+import copy
+import glob
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+CLUSTERS = ["health", "civil", "climate", "culture", "digital", "food"]
+HEADER_SECTION = "header"
+# Headings recognised at the start of a line in call files, in document order
+SECTION_HEADINGS = (
+    ("specific_conditions", b"Specific conditions"),
+    ("expected_outcome", b"Expected Outcome"),
+    ("scope", b"Scope:"),
+)
+SECTION_LABELS = {name: marker.decode().rstrip(":") for name, marker in SECTION_HEADINGS}
+MISSING_PAGE = 10**9  # Sort key for calls not listed in the divide file
+DOCUMENT_CACHE_SIZE = 64  # Parsed CallDocuments kept per CorpusIndex (LRU)
+PREFETCH_OFFSETS = (1, -1, 2)  # Neighbours of the current call warmed after each render
+MANIFEST_FILE = ".corpus_manifest.json"  # Stored inside final_output_2
+MANIFEST_VERSION = 1
+WATCH_INTERVAL = 1.0  # Seconds between CorpusWatcher polls
+
+
+def get_divide_file_path(root_dir, cluster):
+    """Path of the divide_<cluster>.txt table of contents for a cluster"""
+    return os.path.join(root_dir, cluster, f"divide_{cluster}.txt")
+
+
+CALL_LINE_RE = re.compile(r'^(HORIZON-[^:\s]+)\s*:\s*(.*)$')
+# Text followed by a dot leader (or at least a space) and the page number, e.g. "Title .....58"
+PAGED_TEXT_RE = re.compile(r'^(.*?)(?:\s*\.+\s*|\s+)(\d+)$')
+# One heading segment of a line that may hold several, e.g. "Destination - A.... 93 Destination - B.... 94"
+HEADING_SEGMENT_RE = re.compile(r'\s*(.*?)\s*\.{2,}\s*(\d+)(?=\s|$)')
+
+
+class DivideEntry:
+    """One call listed in a divide_<cluster>.txt file"""
+
+    __slots__ = ("call_id", "title", "destination", "page", "line_number")
+
+    def __init__(self, call_id, title, destination, page, line_number):
+        self.call_id = call_id
+        self.title = title
+        self.destination = destination
+        self.page = page
+        self.line_number = line_number
+
+    @property
+    def full_name(self):
+        return f"{self.call_id}: {self.title}" if self.title else self.call_id
+
+    def __repr__(self):
+        return f"DivideEntry({self.call_id!r}, page={self.page!r}, line={self.line_number})"
+
+
+def split_page_number(text):
+    """Split "Title ......58" into ("Title", 58); the page is None when the text has none"""
+    match = PAGED_TEXT_RE.match(text)
+    if match:
+        return match.group(1).rstrip(". ").strip(), int(match.group(2))
+    return text.rstrip(". ").strip(), None
+
+
+def split_headings(text):
+    """Split a heading line into its headings, e.g. two destinations printed on one line"""
+    headings = [m.group(1).rstrip(". ") for m in HEADING_SEGMENT_RE.finditer(text)]
+    tail = HEADING_SEGMENT_RE.sub("", text).strip()
+    if tail:
+        headings.append(split_page_number(tail)[0])
+    return [h for h in headings if h]
+
+
+def parse_divide_file(divide_file_path):
+    """Parse a divide file in one streaming pass.
+
+    Returns (entries, warnings): a DivideEntry per call in file order, and
+    human readable notes about lines that could not be fully understood.
+    A call line without a page number is continued by the following line
+    (titles wrapped by the PDF extraction). Every other line is a heading;
+    the last heading before a call is its destination.
+    """
+    entries = []
+    warnings = []
+    seen = set()
+    destination = ""
+    pending = None  # (call_id, title, line_number) of a wrapped call line
+    try:
+        with open(divide_file_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                stripped = line.strip()
+                if not stripped:
+                    continue
+                match = CALL_LINE_RE.match(stripped)
+                if match:
+                    if pending:
+                        warnings.append(f"line {pending[2]}: no page number for {pending[0]}")
+                        entries.append(DivideEntry(pending[0], pending[1], destination, None, pending[2]))
+                        pending = None
+                    call_id = match.group(1)
+                    title, page = split_page_number(match.group(2))
+                    if call_id in seen:
+                        warnings.append(f"line {line_number}: duplicate entry for {call_id}, keeping the first")
+                        continue
+                    seen.add(call_id)
+                    if page is None:
+                        pending = (call_id, title, line_number)
+                    else:
+                        entries.append(DivideEntry(call_id, title, destination, page, line_number))
+                elif pending:
+                    call_id, title, first_line = pending
+                    rest, page = split_page_number(stripped)
+                    title = f"{title} {rest}".strip()
+                    if page is None:
+                        pending = (call_id, title, first_line)
+                    else:
+                        entries.append(DivideEntry(call_id, title, destination, page, first_line))
+                        pending = None
+                elif stripped.startswith("HORIZON-"):
+                    warnings.append(f"line {line_number}: unrecognised call line {stripped[:60]!r}")
+                else:
+                    headings = split_headings(stripped)
+                    if headings:
+                        destination = headings[-1]
+        if pending:
+            warnings.append(f"line {pending[2]}: no page number for {pending[0]}")
+            entries.append(DivideEntry(pending[0], pending[1], destination, None, pending[2]))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        warnings.append(f"could not parse {divide_file_path}: {e}")
+    return entries, warnings
+
+
+def get_full_call_names(divide_file_path, entries=None):
+    """Parse divide_cluster file to map call_ids to their full names (with description)."""
+    if entries is None:
+        entries = parse_divide_file(divide_file_path)[0]
+    return {entry.call_id: entry.full_name for entry in entries}
+
+
+def get_page_numbers(divide_file_path, entries=None):
+    """Parse divide file once to map call_ids to their page numbers"""
+    if entries is None:
+        entries = parse_divide_file(divide_file_path)[0]
+    return {entry.call_id: entry.page for entry in entries if entry.page is not None}
+
+
+def get_call_files(cluster_dir):
+    """List the call files of a cluster directory (everything except the divide file)"""
+    return [
+        path for path in glob.glob(os.path.join(cluster_dir, "*.txt"))
+        if not os.path.basename(path).startswith("divide_")
+    ]
+
+
+def get_sorted_files(cluster_dir, cluster, root_dir, page_map=None):
+    """Get files sorted by page number from divide file"""
+    txt_files = get_call_files(cluster_dir)
+    divide_file_path = get_divide_file_path(root_dir, cluster)
+
+    if page_map is None:
+        if not os.path.exists(divide_file_path):
+            # Fallback to alphabetical sorting
+            return sorted(txt_files)
+        page_map = get_page_numbers(divide_file_path)
+
+    # Sort by page number, calls missing from the divide file go last
+    def get_page_sort_key(file_path):
+        fname = os.path.basename(file_path)
+        return (page_map.get(call_id_from_path(file_path), MISSING_PAGE), fname)
+
+    return sorted(txt_files, key=get_page_sort_key)
+
+
+def get_destination_mapping(divide_file_path, entries=None):
+    """Parse divide file to map call_ids to their destinations"""
+    if entries is None:
+        entries = parse_divide_file(divide_file_path)[0]
+    return {entry.call_id: entry.destination for entry in entries if entry.destination}
+
+
+class ClusterMetadata:
+    """Immutable view of one parsed divide file, shared by every session"""
+
+    __slots__ = ("divide_file_path", "entries", "warnings", "pages", "destinations", "call_names")
+
+    def __init__(self, divide_file_path, entries, warnings):
+        self.divide_file_path = divide_file_path
+        self.entries = tuple(entries)
+        self.warnings = tuple(warnings)
+        self.pages = MappingProxyType(get_page_numbers(divide_file_path, entries))
+        self.destinations = MappingProxyType(get_destination_mapping(divide_file_path, entries))
+        self.call_names = MappingProxyType(get_full_call_names(divide_file_path, entries))
+
+
+_metadata_cache = {}  # divide file path -> ((mtime_ns, size), ClusterMetadata)
+_metadata_lock = threading.Lock()
+
+
+def get_cluster_metadata(divide_file_path, content_hash=None):
+    """ClusterMetadata for a divide file, parsed once per content hash (or (mtime, size)) per process"""
+    stamp = content_hash
+    if stamp is None:
+        try:
+            st = os.stat(divide_file_path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            pass
+    with _metadata_lock:
+        cached = _metadata_cache.get(divide_file_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        metadata = ClusterMetadata(divide_file_path, *parse_divide_file(divide_file_path))
+        # Replacing the entry drops the metadata of the previous version
+        _metadata_cache[divide_file_path] = (stamp, metadata)
+        return metadata
+
+
+def index_sections(data):
+    """Byte offsets of the recognised headings in a call file.
+
+    Returns [(section, start), ...] in file order, always starting with
+    ("header", 0). Each heading is taken from the first line that starts
+    with it; a section ends where the next one starts.
+    """
+    sections = [(HEADER_SECTION, 0)]
+    remaining = dict(SECTION_HEADINGS)
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        stripped = line.lstrip()
+        for name, marker in list(remaining.items()):
+            if stripped.startswith(marker):
+                sections.append((name, offset))
+                del remaining[name]
+                break
+        if not remaining:
+            break
+        offset += len(line)
+    return sections
+
+
+def section_span(sections, name, size):
+    """(start, end) byte span of a section from index_sections, or None if absent"""
+    for i, (section, start) in enumerate(sections):
+        if section == name:
+            end = sections[i + 1][1] if i + 1 < len(sections) else size
+            return start, end
+    return None
+
+
+def hash_file(file_path):
+    """BLAKE2b hex digest of a file's content"""
+    digest = hashlib.blake2b()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ManifestEntry:
+    """One corpus file: where it is, its stat stamp and its content hash"""
+
+    __slots__ = ("path", "size", "mtime_ns", "blake2b", "call_id", "cluster")
+
+    def __init__(self, path, size, mtime_ns, blake2b, call_id, cluster):
+        self.path = path  # relative to the corpus root, "/"-separated
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.blake2b = blake2b
+        self.call_id = call_id
+        self.cluster = cluster
+
+    def __repr__(self):
+        return f"ManifestEntry({self.path!r}, {self.blake2b[:12]})"
+
+
+class CorpusManifest:
+    """Content hashes of every .txt file of the corpus, kept in final_output_2/.corpus_manifest.json.
+
+    refresh() stats every file and rehashes only those whose size or
+    mtime_ns differ from their entry, so checking an unchanged corpus costs
+    one scandir per cluster. digest combines every (path, hash) pair and is
+    the signature derived caches key on: a file that was touched but not
+    changed leaves it as it was.
+    """
+
+    def __init__(self, root_dir, clusters, entries):
+        self.root_dir = root_dir
+        self.clusters = list(clusters)
+        self.entries = entries  # relative path -> ManifestEntry
+        digest = hashlib.blake2b(digest_size=16)
+        for path in sorted(entries):
+            digest.update(f"{path}\0{entries[path].blake2b}\n".encode("utf-8"))
+        self.digest = digest.hexdigest()
+
+    def changed_paths(self, other):
+        """Relative paths added, removed or changed in content between this manifest and other"""
+        return {
+            path for path in self.entries.keys() | other.entries.keys()
+            if path not in self.entries or path not in other.entries
+            or self.entries[path].blake2b != other.entries[path].blake2b
+        }
+
+    def relative_path(self, file_path):
+        return os.path.relpath(file_path, self.root_dir).replace(os.sep, "/")
+
+    def hash_of(self, file_path):
+        """Content hash of a corpus file, or None if it is not in the manifest"""
+        entry = self.entries.get(self.relative_path(file_path))
+        return entry.blake2b if entry is not None else None
+
+    @classmethod
+    def load(cls, root_dir, clusters):
+        """The saved manifest, or an empty one when it is missing, unreadable or outdated"""
+        entries = {}
+        try:
+            with open(os.path.join(root_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("version") == MANIFEST_VERSION:
+                for row in saved["files"]:
+                    entry = ManifestEntry(*row)
+                    entries[entry.path] = entry
+        except (OSError, ValueError, KeyError, TypeError):
+            entries = {}
+        return cls(root_dir, clusters, entries)
+
+    def save(self):
+        path = os.path.join(self.root_dir, MANIFEST_FILE)
+        rows = [[e.path, e.size, e.mtime_ns, e.blake2b, e.call_id, e.cluster]
+                for _, e in sorted(self.entries.items())]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": rows}, f, indent=0)
+        os.replace(tmp_path, path)
+
+    def refresh(self):
+        """This manifest if no file's stat changed, else an updated (and saved) one"""
+        entries = {}
+        changed = False
+        for cluster in self.clusters:
+            try:
+                with os.scandir(os.path.join(self.root_dir, cluster)) as it:
+                    files = [(entry.name, entry.path, entry.stat()) for entry in it
+                             if entry.is_file() and entry.name.endswith(".txt")]
+            except FileNotFoundError:
+                continue
+            for name, file_path, st in files:
+                path = f"{cluster}/{name}"
+                entry = self.entries.get(path)
+                if entry is None or entry.size != st.st_size or entry.mtime_ns != st.st_mtime_ns:
+                    try:
+                        entry = ManifestEntry(path, st.st_size, st.st_mtime_ns, hash_file(file_path),
+                                              call_id_from_path(name), cluster)
+                    except FileNotFoundError:
+                        continue
+                    changed = True
+                entries[path] = entry
+        if not changed and len(entries) == len(self.entries):
+            return self
+        manifest = CorpusManifest(self.root_dir, self.clusters, entries)
+        try:
+            manifest.save()
+        except OSError:
+            pass
+        return manifest
+
+
+_corpus_manifest = None
+_corpus_manifest_lock = threading.Lock()
+
+
+def get_corpus_manifest(root_dir, clusters):
+    """Process-wide CorpusManifest, loaded from disk once and refreshed (stat only) on every call"""
+    global _corpus_manifest
+    with _corpus_manifest_lock:
+        manifest = _corpus_manifest
+        if manifest is None or manifest.root_dir != root_dir or manifest.clusters != list(clusters):
+            manifest = CorpusManifest.load(root_dir, clusters)
+        manifest = manifest.refresh()
+        _corpus_manifest = manifest
+        return manifest
+
+
+class CorpusIndex:
+    """Everything main() needs about final_output_2, parsed once and served from dicts.
+
+    For every cluster it holds the ordered call files, page numbers, destinations,
+    full call titles, and for every call file its bytes plus the byte offsets of its
+    sections, so showing a pane is a slice of an in-memory buffer. The signature is
+    the manifest digest; files whose hash is unchanged are taken over from the
+    previous index instead of being read again. Built from a CorpusSnapshot
+    (snapshot.py) instead, the buffers are memoryview slices of the mapped pack.
+    """
+
+    def __init__(self, root_dir, clusters, manifest=None, previous=None, snapshot=None):
+        self.root_dir = root_dir
+        self.clusters = list(clusters)
+        self.snapshot = snapshot
+        if snapshot is not None:
+            self.manifest = None
+            self.signature = snapshot.signature
+        else:
+            self.manifest = manifest if manifest is not None else get_corpus_manifest(root_dir, self.clusters)
+            self.signature = self.manifest.digest
+        self.files = {}          # cluster -> [path, ...] in page order
+        self.metadata = {}       # cluster -> shared ClusterMetadata
+        self.locations = {}      # call_id -> (cluster, path)
+        self.pages = {}          # cluster -> {call_id: page}
+        self.destinations = {}   # cluster -> {call_id: destination}
+        self.call_names = {}     # cluster -> {call_id: "call_id: title"}
+        self.buffers = {}        # path -> raw bytes of the call file
+        self.sections = {}       # path -> [(section, byte offset), ...] from index_sections
+        self.documents = OrderedDict()  # path -> CallDocument, LRU filled by document()
+        self._documents_lock = threading.Lock()
+        self.divide_entries = {}  # cluster -> [DivideEntry, ...] in divide file order
+        self.divide_warnings = {}  # cluster -> [str, ...] from parse_divide_file
+        if previous is not None and (previous.root_dir != root_dir or previous.manifest is None):
+            previous = None
+        for cluster in self.clusters:
+            if snapshot is not None:
+                self._index_snapshot_cluster(cluster)
+            else:
+                self._index_cluster(cluster, previous)
+
+    def _set_cluster(self, cluster, metadata, txt_files):
+        self.files[cluster] = txt_files
+        self.metadata[cluster] = metadata
+        self.pages[cluster] = metadata.pages
+        self.destinations[cluster] = metadata.destinations
+        self.call_names[cluster] = metadata.call_names
+        self.divide_entries[cluster] = metadata.entries
+        self.divide_warnings[cluster] = metadata.warnings
+        for path in txt_files:
+            self.locations.setdefault(call_id_from_path(path), (cluster, path))
+
+    def _index_cluster(self, cluster, previous=None):
+        cluster_dir = os.path.join(self.root_dir, cluster)
+        divide_file_path = get_divide_file_path(self.root_dir, cluster)
+        metadata = get_cluster_metadata(divide_file_path, self.manifest.hash_of(divide_file_path))
+        txt_files = get_sorted_files(cluster_dir, cluster, self.root_dir, metadata.pages) if os.path.isdir(cluster_dir) else []
+        self._set_cluster(cluster, metadata, txt_files)
+        for path in txt_files:
+            content_hash = self.manifest.hash_of(path)
+            if (previous is not None and path in previous.buffers and content_hash is not None
+                    and previous.manifest.hash_of(path) == content_hash):
+                self.buffers[path] = previous.buffers[path]
+                self.sections[path] = previous.sections[path]
+                continue
+            try:
+                self._load_call(path)
+            except OSError:
+                pass
+
+    def _index_snapshot_cluster(self, cluster):
+        """Files, metadata and zero-copy buffers of a cluster from the snapshot, no file reads"""
+        divide_file_path = get_divide_file_path(self.root_dir, cluster)
+        entries, warnings, calls = self.snapshot.cluster(cluster)
+        txt_files = [os.path.join(self.root_dir, *path.split("/")) for path, _, _ in calls]
+        self._set_cluster(cluster, ClusterMetadata(divide_file_path, entries, warnings), txt_files)
+        for path, (_, data, sections) in zip(txt_files, calls):
+            self.buffers[path] = data
+            self.sections[path] = sections
+
+    def with_changes(self, manifest, changed_paths):
+        """Copy of this index for a newer manifest that re-indexes only the clusters with changed files.
+
+        Within those clusters unchanged files keep their buffers; cached
+        documents of changed files are dropped. Other sessions keep using
+        this index until their next rerun.
+        """
+        index = copy.copy(self)
+        index.manifest = manifest
+        index.signature = manifest.digest
+        for name in ("files", "metadata", "pages", "destinations", "call_names", "buffers", "sections",
+                     "divide_entries", "divide_warnings"):
+            setattr(index, name, dict(getattr(self, name)))
+        changed_files = {os.path.join(self.root_dir, *path.split("/")) for path in changed_paths}
+        with self._documents_lock:
+            index.documents = OrderedDict((p, d) for p, d in self.documents.items() if p not in changed_files)
+        index._documents_lock = threading.Lock()
+        index.locations = {}
+        changed_clusters = {path.split("/")[0] for path in changed_paths}
+        for cluster in index.clusters:
+            if cluster in changed_clusters:
+                for path in index.files[cluster]:
+                    index.buffers.pop(path, None)
+                    index.sections.pop(path, None)
+                index._index_cluster(cluster, previous=self)
+        # Rebuilt so removed calls disappear and first-listed locations stay first
+        index.locations.clear()
+        for cluster in index.clusters:
+            for path in index.files[cluster]:
+                index.locations.setdefault(call_id_from_path(path), (cluster, path))
+        return index
+
+    def _load_call(self, file_path):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        self.buffers[file_path] = data
+        self.sections[file_path] = index_sections(data)
+        return data
+
+    def is_stale(self, manifest=None):
+        """True if any corpus file was added, removed or changed in content since the index was built"""
+        if manifest is None:
+            manifest = get_corpus_manifest(self.root_dir, self.clusters)
+        return manifest.digest != self.signature
+
+    def read_section(self, file_path, name):
+        """Decoded text of one section of a call file ("" if the file has no such section)"""
+        data = self.buffers.get(file_path)
+        if data is None:
+            data = self._load_call(file_path)
+        span = section_span(self.sections[file_path], name, len(data))
+        if span is None:
+            return ""
+        return str(data[span[0]:span[1]], "utf-8", "ignore")
+
+    def document(self, file_path):
+        """Parsed CallDocument for a call file, built on first use and kept in a bounded LRU"""
+        with self._documents_lock:
+            doc = self.documents.get(file_path)
+            if doc is not None:
+                self.documents.move_to_end(file_path)
+                return doc
+        data = self.buffers.get(file_path)
+        if data is None:
+            data = self._load_call(file_path)
+        doc = CallDocument.from_bytes(call_id_from_path(file_path), data, self.sections[file_path])
+        with self._documents_lock:
+            self.documents[file_path] = doc
+            while len(self.documents) > DOCUMENT_CACHE_SIZE:
+                self.documents.popitem(last=False)
+        return doc
+
+    def prefetch(self, files, position, offsets=PREFETCH_OFFSETS):
+        """Parse the calls around files[position] in the background so Prev/Next hit the LRU.
+
+        files is the list the annotator steps through (page order, the
+        uncertainty queue or a filtered view), not necessarily self.files.
+        """
+        paths = [files[position + o] for o in offsets if 0 <= position + o < len(files)]
+        if paths:
+            _prefetch_executor.submit(self._warm, paths)
+
+    def _warm(self, paths):
+        for path in paths:
+            try:
+                self.document(path)
+            except Exception:
+                pass
+
+
+class CallDocument:
+    """A call file split into its named sections, heading labels removed"""
+
+    __slots__ = ("call_id", "header", "specific_conditions", "expected_outcome", "scope")
+
+    def __init__(self, call_id, header="", specific_conditions="", expected_outcome="", scope=""):
+        self.call_id = call_id
+        self.header = header
+        self.specific_conditions = specific_conditions
+        self.expected_outcome = expected_outcome
+        self.scope = scope
+
+    @classmethod
+    def from_bytes(cls, call_id, data, sections=None):
+        """Build a CallDocument from raw file bytes and (optionally precomputed) index_sections"""
+        if sections is None:
+            sections = index_sections(data)
+        texts = {}
+        for name, _ in sections:
+            start, end = section_span(sections, name, len(data))
+            # str() decodes bytes and memoryview slices of a snapshot alike
+            text = str(data[start:end], "utf-8", "ignore").replace("\r\n", "\n")
+            texts[name] = strip_heading(text, SECTION_LABELS.get(name, "")).strip()
+        return cls(call_id, **texts)
+
+    def __repr__(self):
+        return f"CallDocument({self.call_id!r})"
+
+
+def strip_heading(text, label):
+    """Remove a leading heading label such as "Expected Outcome :" from a section"""
+    if label and text.startswith(label):
+        text = text[len(label):].lstrip(" ")
+        if text.startswith(":"):
+            text = text[1:]
+    return text
+
+
+def call_id_from_path(file_path):
+    """Call id of a call file, i.e. its basename without .txt"""
+    return os.path.basename(file_path).replace(".txt", "")
+
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="corpus-prefetch")
+_corpus_index = None
+_corpus_index_lock = threading.Lock()
+_watcher = None
+
+
+class CorpusWatcher:
+    """Polling thread that keeps the process-wide CorpusIndex in step with the tree.
+
+    Every WATCH_INTERVAL seconds it refreshes the manifest (stat only, so
+    only touched files are rehashed) and swaps in an index with just the
+    changed files re-read and their clusters re-sorted. Reruns then take the
+    current index without scanning anything themselves. For an index served
+    from a snapshot the first poll is also what checks the pack against the
+    tree.
+    """
+
+    def __init__(self, root_dir, clusters, interval=WATCH_INTERVAL):
+        self.root_dir = root_dir
+        self.clusters = list(clusters)
+        self.interval = interval
+        self.manifest = None  # Last manifest applied to the index
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def is_alive(self):
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                pass
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        """Apply whatever changed since the last poll to the shared index"""
+        global _corpus_index
+        manifest = get_corpus_manifest(self.root_dir, self.clusters)
+        if manifest is self.manifest:
+            return
+        with _corpus_index_lock:
+            index = _corpus_index
+            if self._stop.is_set() or index is None or index.root_dir != self.root_dir:
+                return
+            if manifest.digest != index.signature:
+                if index.manifest is None:
+                    # Snapshot no longer matches the tree
+                    _corpus_index = CorpusIndex(self.root_dir, self.clusters, manifest)
+                else:
+                    _corpus_index = index.with_changes(manifest, index.manifest.changed_paths(manifest))
+        self.manifest = manifest
+
+
+def load_snapshot_index(root_dir, clusters, snapshot_path):
+    """CorpusIndex served from a packed snapshot, or None if it is missing, invalid or lacks a cluster"""
+    from snapshot import CorpusSnapshot
+    try:
+        snapshot = CorpusSnapshot(snapshot_path)
+    except (OSError, ValueError):
+        return None
+    if not set(clusters) <= set(snapshot.clusters):
+        snapshot.close()
+        return None
+    return CorpusIndex(root_dir, clusters, snapshot=snapshot)
+
+
+def get_corpus_index(root_dir, clusters, snapshot_path=None, watch=True):
+    """Process-wide CorpusIndex, rebuilt only when the content of a corpus file changes.
+
+    Every Streamlit session gets the same instance; the lock makes sure
+    concurrent reruns do not build it twice. With a snapshot_path the first
+    index comes straight from the memory-mapped pack. With watch a
+    CorpusWatcher thread keeps the index current and this is a plain
+    lookup; without it every call does a stat-only manifest check.
+    """
+    global _corpus_index, _watcher
+    with _corpus_index_lock:
+        index = _corpus_index
+        same_corpus = index is not None and index.root_dir == root_dir and index.clusters == list(clusters)
+        if same_corpus and watch and _watcher is not None and _watcher.is_alive():
+            return index
+        if not same_corpus:
+            index = None
+            if snapshot_path and os.path.exists(snapshot_path):
+                index = load_snapshot_index(root_dir, clusters, snapshot_path)
+        if index is None or (index.snapshot is None and not watch):
+            manifest = get_corpus_manifest(root_dir, clusters)
+            if index is None or index.is_stale(manifest):
+                index = CorpusIndex(root_dir, clusters, manifest, previous=_corpus_index)
+        _corpus_index = index
+        if watch:
+            if _watcher is not None:
+                _watcher.stop()
+            _watcher = CorpusWatcher(root_dir, clusters).start()
+        return index
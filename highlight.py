@@ -0,0 +1,116 @@
+import os
+import re
+import json
+import html
+import threading
+from collections import OrderedDict
+
+from labels import LABEL_COLS
+
+KEYWORDS_FILE = "label_keywords.json"  # Optional override next to app.py: {"NLP": ["regex", ...], ...}
+HIGHLIGHT_CACHE_SIZE = 256
+
+# Case-insensitive regular expressions per label; "none" has no keywords
+DEFAULT_LABEL_KEYWORDS = {
+    "NLP": [
+        r"natural language processing", r"NLP", r"(?:large )?language models?", r"LLMs?",
+        r"generative AI", r"GenAI", r"chat ?bots?", r"text (?:mining|analytics)",
+        r"machine translation", r"speech recognition", r"multilingual",
+    ],
+    "WUDAP": [
+        r"data (?:sharing|spaces?|platforms?|governance|analytics)", r"open data", r"FAIR data",
+        r"big data", r"data-driven", r"interoperab\w+", r"digital twins?",
+    ],
+    "ETHICS": [
+        r"ethic\w*", r"fundamental rights", r"privacy", r"GDPR", r"data protection",
+        r"trustworthy", r"bias(?:es)?", r"fairness", r"transparen\w+", r"accountab\w+",
+        r"gender equality",
+    ],
+    "ENVIRO": [
+        r"environment\w*", r"climate", r"biodiversity", r"emissions?", r"carbon",
+        r"sustainab\w+", r"pollution", r"ecosystems?", r"circular(?:ity)?", r"green transition",
+    ],
+    "OPERATIONS": [
+        r"operational", r"operations", r"logistics", r"supply chains?", r"maintenance",
+        r"practitioners?", r"end[- ]users?", r"deploy\w*", r"pilots?", r"demonstrat\w+",
+    ],
+}
+
+LABEL_COLOURS = {
+    "NLP": "#fde68a",
+    "WUDAP": "#bfdbfe",
+    "ETHICS": "#fbcfe8",
+    "ENVIRO": "#bbf7d0",
+    "OPERATIONS": "#fed7aa",
+}
+
+
+def load_label_keywords(root_dir):
+    """Keyword regexes per label: the defaults, overridden per label by label_keywords.json"""
+    keywords = dict(DEFAULT_LABEL_KEYWORDS)
+    path = os.path.join(root_dir, KEYWORDS_FILE)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            keywords.update(json.load(f))
+    return {label: patterns for label, patterns in keywords.items() if label in LABEL_COLS and patterns}
+
+
+class LabelHighlighter:
+    """All label keyword lists compiled into one alternation, matched in a single pass per text.
+
+    Each label becomes a named group, so one scan of a section yields every
+    hit together with the label it belongs to. Results are cached per text.
+    """
+
+    def __init__(self, label_keywords):
+        self.labels = list(label_keywords)
+        alternatives = []
+        for i, label in enumerate(self.labels):
+            body = "|".join(f"(?:{pattern})" for pattern in label_keywords[label])
+            alternatives.append(f"(?P<l{i}>{body})")
+        self.pattern = re.compile(r"\b(?:" + "|".join(alternatives) + r")\b", re.IGNORECASE) if alternatives else None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def matches(self, text):
+        """[(start, end, label), ...] of keyword hits in text"""
+        if self.pattern is None:
+            return []
+        return [(m.start(), m.end(), self.labels[int(m.lastgroup[1:])]) for m in self.pattern.finditer(text)]
+
+    def highlight(self, text):
+        """(html, {label: hit count}) for a section, computed once per distinct text"""
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+        counts = dict.fromkeys(self.labels, 0)
+        parts = []
+        last = 0
+        for start, end, label in self.matches(text):
+            counts[label] += 1
+            parts.append(html.escape(text[last:start]))
+            colour = LABEL_COLOURS.get(label, "#e5e7eb")
+            parts.append(f'<mark style="background:{colour}" title="{label}">{html.escape(text[start:end])}</mark>')
+            last = end
+        parts.append(html.escape(text[last:]))
+        result = ("".join(parts).replace("\n", "<br>"), counts)
+        with self._lock:
+            self._cache[text] = result
+            while len(self._cache) > HIGHLIGHT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+
+_highlighter = None
+_highlighter_lock = threading.Lock()
+
+
+def get_highlighter(root_dir):
+    """Process-wide LabelHighlighter built from the keyword configuration"""
+    global _highlighter
+    with _highlighter_lock:
+        if _highlighter is None:
+            _highlighter = LabelHighlighter(load_label_keywords(root_dir))
+        return _highlighter
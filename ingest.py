@@ -0,0 +1,333 @@
+"""Build the final_output_2 tree from the work-programme cluster documents.
+
+    python ingest.py SOURCE_DIR [--output final_output_2] [--workers N] [--force] [--prune] [--clusters ...]
+
+SOURCE_DIR holds one document per cluster: <cluster>.pdf, or the text already
+extracted from it as <cluster>.txt with pages separated by form feeds (what
+pdftotext writes). Reading PDFs needs the optional pypdf package. Each cluster
+is split into one HORIZON-*.txt file per call using its table of contents,
+which is written as divide_<cluster>.txt. Clusters are processed in parallel
+worker processes, and a manifest inside the output tree records the BLAKE2
+hash of every source, so unchanged clusters are skipped on the next run.
+A split that finds no table of contents or no calls, or that drops calls
+the last ingest wrote (unless --prune is given), is reported as an error and
+leaves that cluster's files and manifest entry untouched.
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus import CALL_LINE_RE, CLUSTERS, PAGED_TEXT_RE, get_divide_file_path, hash_file, split_headings
+
+MANIFEST_FILE = ".ingest_manifest.json"  # Stored inside the output tree
+MANIFEST_VERSION = 1
+SOURCE_EXTENSIONS = (".pdf", ".txt")  # Preferred first
+RUNNING_LINES = 2  # Lines at the top and bottom of every page checked for running headers and footers
+
+# Table of contents pages have lines ending in a dot leader and a page number
+TOC_LINE_RE = re.compile(r'\.{4,}\s*\d+\s*$')
+# Headings in the body that end the text of the call before them, besides those listed in the contents
+SECTION_BREAK_RE = re.compile(r'^\s*(?:Destination\s*[-–—]|Call\s*[-–—]\s|Other actions not subject to calls for proposals)')
+DIGITS_RE = re.compile(r'\d+')
+SPACE_RE = re.compile(r'\s+')
+
+
+def find_sources(source_dir, clusters=CLUSTERS):
+    """{cluster: path} of <cluster>.pdf, or <cluster>.txt when there is no PDF"""
+    sources = {}
+    for cluster in clusters:
+        for extension in SOURCE_EXTENSIONS:
+            path = os.path.join(source_dir, cluster + extension)
+            if os.path.exists(path):
+                sources[cluster] = path
+                break
+    return sources
+
+
+def read_pages(path):
+    """Text of every page of a source document"""
+    if path.endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise RuntimeError(f"{path}: reading PDFs needs pypdf (pip install pypdf); "
+                               f"or pass the extracted text as {os.path.splitext(path)[0]}.txt")
+        return [page.extract_text() or "" for page in PdfReader(path).pages]
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().split("\f")
+
+
+def strip_running_lines(pages):
+    """Line lists per page without the headers and footers repeated on most pages.
+
+    Page numbers are ignored when comparing, so "Part 6 - Page 12 of 160"
+    counts as the same line on every page.
+    """
+    page_lines = [page.splitlines() for page in pages]
+    counts = Counter()
+    for lines in page_lines:
+        content = [line.strip() for line in lines if line.strip()]
+        counts.update({DIGITS_RE.sub("#", line) for line in content[:RUNNING_LINES] + content[-RUNNING_LINES:]})
+    threshold = max(2, len(page_lines) // 2)
+    running = {line for line, count in counts.items() if count >= threshold}
+    return [[line for line in lines if DIGITS_RE.sub("#", line.strip()) not in running] for lines in page_lines]
+
+
+def split_toc(page_lines):
+    """(table of contents lines, index of the first page after it)"""
+    is_toc = [any(TOC_LINE_RE.search(line) for line in lines) for lines in page_lines]
+    if True not in is_toc:
+        return [], 0
+    start = end = is_toc.index(True)
+    while end < len(page_lines) and is_toc[end]:
+        end += 1
+    return [line for lines in page_lines[start:end] for line in lines], end
+
+
+def toc_entries(toc_lines):
+    """Table of contents entries, a wrapped entry joined onto one line once its page number is reached"""
+    entries = []
+    current = []
+    for line in toc_lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if current and CALL_LINE_RE.match(stripped):
+            # A call also closes an entry whose page number never came
+            entries.append(" ".join(current))
+            current = []
+        current.append(stripped)
+        if PAGED_TEXT_RE.match(stripped):
+            entries.append(" ".join(current))
+            current = []
+    if current:
+        entries.append(" ".join(current))
+    return entries
+
+
+def normalize_heading(text):
+    return SPACE_RE.sub(" ", text.replace("–", "-").replace("—", "-")).strip().casefold()
+
+
+def split_calls(body_lines, following_headings):
+    """{call_id: lines} from each call's heading up to the next call or section heading.
+
+    following_headings maps every call to the headings listed after it in
+    the table of contents, so only those (normalised) can end its text; a
+    title line that happens to read like another destination does not.
+    """
+    starts = []
+    seen = set()
+    for i, line in enumerate(body_lines):
+        match = CALL_LINE_RE.match(line.strip())
+        if match and match.group(1) in following_headings and match.group(1) not in seen:
+            seen.add(match.group(1))
+            starts.append((i, match.group(1)))
+    calls = {}
+    for n, (start, call_id) in enumerate(starts):
+        end = starts[n + 1][0] if n + 1 < len(starts) else len(body_lines)
+        headings = {normalize_heading(heading) for heading in following_headings[call_id]}
+        for i in range(start + 1, end):
+            if SECTION_BREAK_RE.match(body_lines[i]) or normalize_heading(body_lines[i]) in headings:
+                end = i
+                break
+        calls[call_id] = body_lines[start:end]
+    return calls
+
+
+def ingest_cluster(job):
+    """Worker: (cluster, divide file text, {call_id: call file text}, warnings) for one source"""
+    cluster, path = job
+    page_lines = strip_running_lines(read_pages(path))
+    toc_lines, body_start = split_toc(page_lines)
+    entries = toc_entries(toc_lines)
+    following_headings = {}  # call_id -> headings between it and the next call in the contents, in order
+    last_call = None
+    for entry in entries:
+        match = CALL_LINE_RE.match(entry)
+        if match:
+            last_call = match.group(1)
+            following_headings.setdefault(last_call, [])
+        elif last_call is not None:
+            following_headings[last_call].extend(split_headings(entry))
+    call_ids = list(following_headings)
+    body_lines = [line for lines in page_lines[body_start:] for line in lines]
+    calls = split_calls(body_lines, following_headings)
+
+    warnings = []
+    if not entries:
+        warnings.append("no table of contents found")
+    warnings.extend(f"{call_id}: listed in the table of contents but not found in the text"
+                    for call_id in call_ids if call_id not in calls)
+    # Call files keep the CRLF line endings of the original tree and, like most of its files, no final newline
+    call_texts = {call_id: "\r\n".join(lines).rstrip() for call_id, lines in calls.items()}
+    return cluster, "\n".join(entries) + "\n", call_texts, warnings
+
+
+def same_call_text(existing, data):
+    # The extracted text does not say how the original file ended
+    return existing.rstrip() == data.rstrip()
+
+
+def same_divide_text(existing, data):
+    # Divide files written by hand wrap long entries over several lines; compare the joined entries
+    return toc_entries(existing.decode("utf-8", "ignore").splitlines()) == data.decode("utf-8").splitlines()
+
+
+def write_if_changed(path, data, same=same_call_text):
+    """Atomically write bytes unless the file already holds the same text; returns (written, bytes now in the file).
+
+    A file that only differs in layout is left alone: rewriting it would
+    change its content hash and invalidate every cache keyed on it.
+    """
+    try:
+        with open(path, "rb") as f:
+            existing = f.read()
+        if same(existing, data):
+            return False, existing
+    except FileNotFoundError:
+        pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True, data
+
+
+def write_cluster(output_dir, cluster, divide_text, call_texts, previous_files=()):
+    """Write one cluster's files; returns ({relative path: BLAKE2b}, files written, stale files removed)"""
+    cluster_dir = os.path.join(output_dir, cluster)
+    os.makedirs(cluster_dir, exist_ok=True)
+    outputs = [(get_divide_file_path(output_dir, cluster), divide_text, same_divide_text)]
+    outputs += [(os.path.join(cluster_dir, f"{call_id}.txt"), text, same_call_text) for call_id, text in call_texts.items()]
+    files = {}
+    written = 0
+    for path, text, same in outputs:
+        changed, data = write_if_changed(path, text.encode("utf-8"), same)
+        written += changed
+        files[os.path.relpath(path, output_dir).replace(os.sep, "/")] = hashlib.blake2b(data).hexdigest()
+    # Calls dropped from the new release
+    removed = 0
+    for relative_path in previous_files:
+        if relative_path not in files:
+            try:
+                os.remove(os.path.join(output_dir, relative_path))
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return files, written, removed
+
+
+def load_manifest(output_dir):
+    """Manifest of the last ingest into output_dir (empty when there is none or it is outdated)"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "clusters": {}}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def split_error(divide_text, call_texts, previous_calls, prune=False):
+    """Why a cluster's split must not replace its files, or None if it can"""
+    if not divide_text.strip():
+        return "no table of contents found"
+    if not call_texts:
+        return "no calls found"
+    missing = [call_id for call_id in previous_calls if call_id not in call_texts]
+    if missing and not prune:
+        shown = ", ".join(missing[:5]) + (", ..." if len(missing) > 5 else "")
+        return f"{len(missing)} calls of the last ingest are missing ({shown}); pass --prune to remove them"
+    return None
+
+
+def build_tree(source_dir, output_dir, clusters=CLUSTERS, workers=None, force=False, prune=False):
+    """Ingest every cluster source whose hash changed; returns ({cluster: summary line}, clusters that failed)"""
+    sources = find_sources(source_dir, clusters)
+    manifest = load_manifest(output_dir)
+    previous = manifest["clusters"]
+    summary = {cluster: "no source found" for cluster in clusters if cluster not in sources}
+    failed = []
+
+    hashes = {}
+    jobs = []
+    for cluster, path in sources.items():
+        hashes[cluster] = hash_file(path)
+        entry = previous.get(cluster)
+        if (not force and entry and entry["source_blake2b"] == hashes[cluster]
+                and all(os.path.exists(os.path.join(output_dir, p)) for p in entry["files"])):
+            summary[cluster] = f"unchanged, {len(entry['calls'])} calls"
+            continue
+        jobs.append((cluster, path))
+
+    if workers == 1 or len(jobs) < 2:
+        results = [ingest_cluster(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(jobs))) as pool:
+            results = list(pool.map(ingest_cluster, jobs))
+
+    for cluster, divide_text, call_texts, warnings in results:
+        error = split_error(divide_text, call_texts, previous.get(cluster, {}).get("calls", ()), prune)
+        if error:
+            # A bad extraction must not wipe the annotators' corpus
+            failed.append(cluster)
+            summary[cluster] = f"error: {error}; files left unchanged"
+            summary[cluster] += "".join(f"\n    warning: {warning}" for warning in warnings)
+            continue
+        old_files = previous.get(cluster, {}).get("files", {})
+        files, written, removed = write_cluster(output_dir, cluster, divide_text, call_texts, old_files)
+        previous[cluster] = {
+            "source": os.path.basename(sources[cluster]),
+            "source_blake2b": hashes[cluster],
+            "calls": list(call_texts),
+            "files": files,
+            "warnings": warnings,
+        }
+        summary[cluster] = f"{len(call_texts)} calls, {written} files written, {removed} removed"
+        summary[cluster] += "".join(f"\n    warning: {warning}" for warning in warnings)
+    if len(failed) < len(jobs):
+        save_manifest(output_dir, manifest)
+    return summary, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split the work-programme cluster documents into final_output_2.")
+    parser.add_argument("source_dir", help="directory with <cluster>.pdf or extracted <cluster>.txt files")
+    parser.add_argument("--output", default=os.path.join(os.getcwd(), "final_output_2"),
+                        help="output tree (default: ./final_output_2)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count, 1 = no pool)")
+    parser.add_argument("--force", action="store_true", help="re-ingest clusters whose source did not change")
+    parser.add_argument("--prune", action="store_true", help="remove calls that are no longer in a cluster's source")
+    parser.add_argument("--clusters", nargs="+", default=CLUSTERS, choices=CLUSTERS, help="clusters to ingest")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        summary, failed = build_tree(args.source_dir, args.output, args.clusters, args.workers, args.force, args.prune)
+    except RuntimeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    for cluster in args.clusters:
+        print(f"{cluster}: {summary[cluster]}")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+import os
+import json
+import sqlite3
+import time
+import atexit
+import threading
+
+import pandas as pd
+
+LABEL_COLS = ["NLP", "WUDAP", "ETHICS", "ENVIRO", "OPERATIONS", "none"]
+JOURNAL_COMPACT_EVERY = 200  # Journal entries after which append_labels rewrites the CSV snapshot
+WRITE_DEBOUNCE = 0.5         # Seconds without a new change before LabelWriter writes
+WRITE_MAX_DELAY = 2.0        # Longest a change waits for its write during a burst of toggles
+
+_journal_lengths = {}  # journal path -> number of entries appended since the last compaction
+_journal_locks = {}    # journal path -> lock serialising appends and compactions in this process
+_journal_locks_lock = threading.Lock()
+
+
+def get_journal_path(csv_path):
+    """Append-only journal kept next to a labels CSV"""
+    return os.path.splitext(csv_path)[0] + ".journal.jsonl"
+
+
+def get_compacting_path(journal_path):
+    """Where compaction moves a journal while folding it into the CSV"""
+    return journal_path + ".compacting"
+
+
+def get_journal_lock(journal_path):
+    with _journal_locks_lock:
+        return _journal_locks.setdefault(journal_path, threading.Lock())
+
+
+def read_journal(journal_path):
+    """Yield (call_id, labels) events from a journal, skipping torn and blank lines"""
+    try:
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                call_id = event.get("CallID")
+                if call_id:
+                    yield call_id, {col: event.get(col, "") for col in LABEL_COLS}
+    except FileNotFoundError:
+        return
+
+
+def read_snapshot(csv_path):
+    """Read a labels CSV into {CallID: {label: value}} without per-row Python work.
+
+    Only CallID and LABEL_COLS are read, all as strings; empty cells stay ""
+    instead of becoming NaN and label columns missing from older files are
+    filled with "".
+    """
+    columns = ["CallID"] + LABEL_COLS
+    df = pd.read_csv(
+        csv_path,
+        usecols=lambda col: col in columns,
+        dtype=str,
+        keep_default_na=False,
+        na_filter=False,
+    )
+    if "CallID" not in df.columns:
+        return {}
+    df = df.reindex(columns=columns, fill_value="")
+    df = df[df["CallID"] != ""].drop_duplicates("CallID", keep="last")
+    # Create dict with CallID as key and dict of labels as value, column by column
+    rows = zip(*(df[col].tolist() for col in LABEL_COLS))
+    return {call_id: dict(zip(LABEL_COLS, row)) for call_id, row in zip(df["CallID"].tolist(), rows)}
+
+
+def load_labels(csv_path):
+    """Load existing labels from the CSV snapshot and replay the journal on top.
+
+    A journal left aside by an interrupted compaction is replayed first,
+    as it holds the older events.
+    """
+    result = read_snapshot(csv_path) if os.path.exists(csv_path) else {}
+    journal_path = get_journal_path(csv_path)
+    for path in (get_compacting_path(journal_path), journal_path):
+        for call_id, labels in read_journal(path):
+            result[call_id] = labels
+    return result
+
+
+def write_snapshot(csv_path, labels_dict):
+    """Write the full CSV snapshot atomically (fsync'd, then renamed into place)"""
+    rows = []
+    for call_id, label_dict in sorted(labels_dict.items()):
+        row = {"CallID": call_id}
+        for col in LABEL_COLS:
+            row[col] = label_dict.get(col, "")
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=["CallID"] + LABEL_COLS)
+    tmp_path = csv_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, csv_path)
+
+
+def save_labels(csv_path, labels_dict):
+    """Write the full CSV snapshot and empty the journal it supersedes"""
+    journal_path = get_journal_path(csv_path)
+    with get_journal_lock(journal_path):
+        write_snapshot(csv_path, labels_dict)
+        for path in (journal_path, get_compacting_path(journal_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        _journal_lengths[journal_path] = 0
+
+
+def append_labels(csv_path, labels_dict, call_ids):
+    """Persist the labels of the given calls as journal entries in one fsync'd append.
+
+    Cost does not depend on how many calls are labelled; every
+    JOURNAL_COMPACT_EVERY entries the journal is folded into the CSV
+    snapshot (see compact_labels).
+    """
+    journal_path = get_journal_path(csv_path)
+    lines = []
+    for call_id in call_ids:
+        label_dict = labels_dict.get(call_id, {})
+        event = {"CallID": call_id}
+        for col in LABEL_COLS:
+            event[col] = label_dict.get(col, "")
+        lines.append(json.dumps(event) + "\n")
+    with get_journal_lock(journal_path), open(journal_path, "a+b") as f:
+        # A crash can leave a torn last line; start on a fresh one so it does not swallow this batch
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        f.write("".join(lines).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+        if journal_path not in _journal_lengths:
+            _journal_lengths[journal_path] = sum(1 for _ in read_journal(journal_path)) - len(lines)
+        _journal_lengths[journal_path] += len(lines)
+        due = _journal_lengths[journal_path] >= JOURNAL_COMPACT_EVERY
+    if due:
+        compact_labels(csv_path)
+
+
+def compact_labels(csv_path):
+    """Fold the journal into the CSV snapshot; returns the compacted labels.
+
+    Runs under the journal's lock, so no append of this process lands
+    between reading the journal and removing it. The journal is first
+    renamed aside and only that file is removed once the CSV is written:
+    an append from another process after the rename starts a new journal
+    instead of being deleted with the old one.
+    """
+    journal_path = get_journal_path(csv_path)
+    compacting_path = get_compacting_path(journal_path)
+    with get_journal_lock(journal_path):
+        # An aside journal left by an interrupted compaction is folded first; do not overwrite it
+        if os.path.exists(journal_path) and not os.path.exists(compacting_path):
+            os.replace(journal_path, compacting_path)
+        labels_dict = load_labels(csv_path)
+        if os.path.exists(compacting_path):
+            write_snapshot(csv_path, labels_dict)
+            os.remove(compacting_path)
+        _journal_lengths[journal_path] = sum(1 for _ in read_journal(journal_path))
+    return labels_dict
+
+
+class CsvLabelStore:
+    """Default backend: labels_<username>.csv snapshot plus its append-only journal"""
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.key = ("csv", csv_path)  # Stores writing to the same files share LabelWriter state
+
+    def load(self):
+        return compact_labels(self.csv_path)
+
+    def save_batch(self, labels_dict, call_ids):
+        append_labels(self.csv_path, labels_dict, sorted(call_ids))
+
+    def export_csv(self, csv_path, labels_dict):
+        save_labels(csv_path, labels_dict)
+
+
+class SqliteLabelStore:
+    """Shared SQLite backend in WAL mode, one row per (user, call_id, label).
+
+    Every toggle upserts only the rows of the toggled call, so several tabs
+    or annotators can write at the same time without overwriting each other.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS labels (
+            user TEXT NOT NULL,
+            call_id TEXT NOT NULL,
+            label TEXT NOT NULL,
+            value TEXT NOT NULL DEFAULT '',
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (user, call_id, label)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS labels_by_call ON labels (call_id, label);
+    """
+    UPSERT = """
+        INSERT INTO labels (user, call_id, label, value, updated_at) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user, call_id, label) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+    """
+
+    def __init__(self, db_path, username):
+        self.db_path = db_path
+        self.username = username
+        self.key = ("sqlite", db_path, username)
+        self._lock = threading.Lock()  # One connection is shared by every session of this user
+        # Streamlit reruns a session on different threads; writes are serialised by SQLite
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def load(self):
+        result = {}
+        with self._lock:
+            rows = self.conn.execute("SELECT call_id, label, value FROM labels WHERE user = ?", (self.username,)).fetchall()
+        for call_id, label, value in rows:
+            if label in LABEL_COLS:
+                result.setdefault(call_id, {col: "" for col in LABEL_COLS})[label] = value
+        return result
+
+    def _upsert(self, labels_dict, call_ids):
+        now = time.time()
+        rows = [
+            (self.username, call_id, col, labels_dict.get(call_id, {}).get(col, ""), now)
+            for call_id in call_ids
+            for col in LABEL_COLS
+        ]
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(self.UPSERT, rows)
+
+    def save_batch(self, labels_dict, call_ids):
+        self._upsert(labels_dict, sorted(call_ids))
+
+    def labels_for_call(self, call_id):
+        """Labels of every annotator for one call: {user: {label: value}}"""
+        result = {}
+        with self._lock:
+            rows = self.conn.execute("SELECT user, label, value FROM labels WHERE call_id = ?", (call_id,)).fetchall()
+        for user, label, value in rows:
+            if label in LABEL_COLS:
+                result.setdefault(user, {col: "" for col in LABEL_COLS})[label] = value
+        return result
+
+    def export_csv(self, csv_path, labels_dict=None):
+        """Write this user's labels in the same CSV format as the default backend"""
+        save_labels(csv_path, self.load() if labels_dict is None else labels_dict)
+
+
+class LabelWriter:
+    """Background thread that coalesces label saves into one write per store.
+
+    submit() only records a snapshot of the labels and the changed call; the
+    thread writes once no change has arrived for WRITE_DEBOUNCE seconds (or
+    WRITE_MAX_DELAY after the first pending change), so a burst of toggles
+    becomes a single store.save_batch(). State is kept per store.key (one
+    labels file or database user, however many sessions write to it) and
+    only while a write is pending or failing.
+    """
+
+    def __init__(self, debounce=WRITE_DEBOUNCE, max_delay=WRITE_MAX_DELAY):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._pending = {}    # store key -> (store, labels snapshot, changed call_ids, first change time, last change time)
+        self._in_flight = set()  # store keys being written
+        self._errors = {}     # store key -> exception of the last failed write, until one succeeds
+        self._flushing = False
+        self._thread = threading.Thread(target=self._run, name="label-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, store, labels_dict, call_id):
+        """Queue call_id's labels for writing.
+
+        The app replaces label dicts rather than mutating them, so a shallow
+        copy of labels_dict is a consistent snapshot.
+        """
+        now = time.monotonic()
+        with self._cond:
+            _, _, call_ids, first, _ = self._pending.get(store.key, (None, None, set(), now, now))
+            self._pending[store.key] = (store, dict(labels_dict), call_ids | {call_id}, first, now)
+            self._cond.notify_all()
+
+    def status(self, store):
+        """(True while a change is waiting or being written, error of the last failed write or None)"""
+        with self._cond:
+            return store.key in self._pending or store.key in self._in_flight, self._errors.get(store.key)
+
+    def flush(self, timeout=10.0):
+        """Write everything pending now and wait for it; True when nothing is left"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._flushing = False
+            return not (self._pending or self._in_flight)
+
+    def _next_batch(self):
+        """Block until a batch is due, then take it: {store key: (store, labels, call_ids)}"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = min(min(first + self.max_delay, last + self.debounce)
+                              for _, _, _, first, last in self._pending.values())
+                    wait = due - time.monotonic()
+                    if self._flushing or wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            batch = {key: (store, labels, call_ids) for key, (store, labels, call_ids, _, _) in self._pending.items()}
+            self._pending = {}
+            self._in_flight = set(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            errors = {}
+            for key, (store, labels, call_ids) in batch.items():
+                try:
+                    store.save_batch(labels, call_ids)
+                except Exception as e:
+                    errors[key] = e
+            with self._cond:
+                for key, (store, labels, call_ids) in batch.items():
+                    if key not in errors:
+                        self._errors.pop(key, None)
+                        continue
+                    # Put the changes back so the next write retries them
+                    self._errors[key] = errors[key]
+                    if key in self._pending:
+                        newer_store, newer_labels, newer_ids, first, last = self._pending[key]
+                        self._pending[key] = (newer_store, newer_labels, call_ids | newer_ids, first, last)
+                    else:
+                        now = time.monotonic()
+                        self._pending[key] = (store, labels, call_ids, now, now)
+                self._in_flight = set()
+                self._cond.notify_all()
+            if errors:
+                # Do not spin on a disk that keeps failing
+                time.sleep(self.max_delay)
+
+
+_label_writer = None
+_label_writer_lock = threading.Lock()
+_sqlite_stores = {}  # (db_path, username) -> SqliteLabelStore
+_sqlite_stores_lock = threading.Lock()
+
+
+def get_sqlite_store(db_path, username):
+    """Process-wide SqliteLabelStore per database and user, so sessions share one connection"""
+    with _sqlite_stores_lock:
+        store = _sqlite_stores.get((db_path, username))
+        if store is None:
+            store = _sqlite_stores[(db_path, username)] = SqliteLabelStore(db_path, username)
+        return store
+
+
+def get_label_writer():
+    """Process-wide LabelWriter, flushed at interpreter exit"""
+    global _label_writer
+    with _label_writer_lock:
+        if _label_writer is None:
+            _label_writer = LabelWriter()
+            atexit.register(_label_writer.flush)
+        return _label_writer
@@ -0,0 +1,202 @@
+import re
+import hashlib
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from corpus import HEADER_SECTION, call_id_from_path
+
+# Abbreviation -> type of action as written after "Type of Action" in the call files
+TYPES_OF_ACTION = {
+    "RIA": "Research and Innovation Actions",
+    "IA": "Innovation Actions",
+    "CSA": "Coordination and Support Actions",
+    "COFUND": "Programme Co-fund Action",
+    "PCP": "Pre-commercial Procurement",
+    "PPI": "Public Procurement of Innovative Solutions",
+}
+OTHER_TYPE = "Other"
+
+NUMBER = r'(\d[\d,]*(?:\.\d+)?)'
+# The wrapped "Expected EU contribution per project" label can land inside the sentence it labels
+LABEL_NOISE = r'(?:\s+(?:contribution\s+per|project))*'
+CONTRIBUTION_RE = re.compile(
+    rf'(?:EU\s+contribution\s+of\s+(?:around|between)|Up\s+to){LABEL_NOISE}\s+EUR{LABEL_NOISE}\s+{NUMBER}'
+    rf'(?:{LABEL_NOISE}\s+and\s+{NUMBER})?{LABEL_NOISE}\s+million', re.IGNORECASE)
+BUDGET_RE = re.compile(rf'total\s+indicative\s+budget\s+for\s+the\s+topic\s+is\s+EUR\s+{NUMBER}\s+million', re.IGNORECASE)
+TYPE_OF_ACTION_RE = re.compile(
+    r'Type\s+of\s+Action\s+(' + "|".join(r'\s+'.join(map(re.escape, name.split())) for name in TYPES_OF_ACTION.values()) + ')',
+    re.IGNORECASE)
+CALL_NAME_RE = re.compile(r'^\s*Call\s*:\s*(.+?)\s*$', re.MULTILINE)
+DEADLINE_RE = re.compile(r'Deadline(?:\(s\)|s)?(?:\s+date)?\s*:?\s*(\d{1,2}\s+[A-Z][a-z]+\s+\d{4})')
+SPACE_RE = re.compile(r'\s+')
+
+
+def parse_amount(text):
+    """EUR million as a float from "12.00" or "1,200.00" (None if missing)"""
+    return float(text.replace(",", "")) if text else None
+
+
+def parse_deadline(text):
+    """datetime.date from "16 September 2026" (None if it does not parse)"""
+    try:
+        return datetime.strptime(SPACE_RE.sub(" ", text), "%d %B %Y").date()
+    except ValueError:
+        return None
+
+
+class CallMetadata:
+    """Typed fields read from the header and Specific conditions of one call file.
+
+    Amounts are in EUR million; contribution_min equals contribution_max
+    when the call gives a single expected contribution per project.
+    """
+
+    __slots__ = ("call_id", "call_name", "type_of_action", "action_code", "contribution_min", "contribution_max",
+                 "indicative_budget", "deadline")
+
+    def __init__(self, call_id, call_name="", type_of_action="", action_code=OTHER_TYPE, contribution_min=None,
+                 contribution_max=None, indicative_budget=None, deadline=None):
+        self.call_id = call_id
+        self.call_name = call_name
+        self.type_of_action = type_of_action
+        self.action_code = action_code
+        self.contribution_min = contribution_min
+        self.contribution_max = contribution_max
+        self.indicative_budget = indicative_budget
+        self.deadline = deadline
+
+    @classmethod
+    def from_text(cls, call_id, header, specific_conditions):
+        """Extract the fields; anything not found stays empty"""
+        text = f"{header}\n{specific_conditions}"
+        call_name = CALL_NAME_RE.search(header)
+        type_of_action = ""
+        action_code = OTHER_TYPE
+        match = TYPE_OF_ACTION_RE.search(text)
+        if match:
+            written = SPACE_RE.sub(" ", match.group(1)).casefold()
+            for code, name in TYPES_OF_ACTION.items():
+                if name.casefold() == written:
+                    type_of_action, action_code = name, code
+                    break
+        contribution = CONTRIBUTION_RE.search(text)
+        contribution_min = contribution_max = None
+        if contribution:
+            contribution_min = parse_amount(contribution.group(1))
+            contribution_max = parse_amount(contribution.group(2)) or contribution_min
+        budget = BUDGET_RE.search(text)
+        deadline = DEADLINE_RE.search(text)
+        return cls(
+            call_id,
+            call_name=SPACE_RE.sub(" ", call_name.group(1)) if call_name else "",
+            type_of_action=type_of_action,
+            action_code=action_code,
+            contribution_min=contribution_min,
+            contribution_max=contribution_max,
+            indicative_budget=parse_amount(budget.group(1)) if budget else None,
+            deadline=parse_deadline(deadline.group(1)) if deadline else None,
+        )
+
+    def summary(self):
+        """One line such as "RIA · Call: DIGITAL · budget EUR 12.00M · EUR 4.00-6.00M per project" """
+        parts = [self.action_code if self.type_of_action else ""]
+        if self.call_name:
+            parts.append(f"Call: {self.call_name}")
+        if self.indicative_budget is not None:
+            parts.append(f"budget EUR {self.indicative_budget:.2f}M")
+        if self.contribution_min is not None:
+            if self.contribution_max != self.contribution_min:
+                parts.append(f"EUR {self.contribution_min:.2f}-{self.contribution_max:.2f}M per project")
+            else:
+                parts.append(f"EUR {self.contribution_min:.2f}M per project")
+        if self.deadline is not None:
+            parts.append(f"deadline {self.deadline:%d %B %Y}")
+        return " · ".join(part for part in parts if part)
+
+    def __repr__(self):
+        return f"CallMetadata({self.call_id!r}, {self.action_code}, {self.indicative_budget})"
+
+
+_extracted = {}  # content hash -> CallMetadata, shared by every table
+_extracted_lock = threading.Lock()
+
+
+def get_call_metadata(corpus_index, file_path):
+    """CallMetadata for a call file, extracted once per content hash per process"""
+    if corpus_index.manifest is not None:
+        content_hash = corpus_index.manifest.hash_of(file_path)
+    else:
+        # Snapshot: hash the mapped bytes instead of the tree
+        data = corpus_index.buffers.get(file_path)
+        content_hash = hashlib.blake2b(data).hexdigest() if data is not None else None
+    with _extracted_lock:
+        metadata = _extracted.get(content_hash)
+    if metadata is None or content_hash is None:
+        metadata = CallMetadata.from_text(call_id_from_path(file_path), corpus_index.read_section(file_path, HEADER_SECTION),
+                                          corpus_index.read_section(file_path, "specific_conditions"))
+        if content_hash is not None:
+            with _extracted_lock:
+                _extracted[content_hash] = metadata
+    return metadata
+
+
+class CallMetadataTable:
+    """CallMetadata of every call in the corpus held as numpy columns.
+
+    Built once per corpus signature; filter() answers a query over all
+    clusters with a few vectorised comparisons. Missing amounts are nan,
+    so a minimum excludes calls that do not state one.
+    """
+
+    def __init__(self, corpus_index):
+        self.signature = corpus_index.signature
+        self.paths = [path for cluster in corpus_index.clusters for path in corpus_index.files[cluster]]
+        self.records = {path: get_call_metadata(corpus_index, path) for path in self.paths}
+        records = [self.records[path] for path in self.paths]
+        self.clusters = np.array([cluster for cluster in corpus_index.clusters for _ in corpus_index.files[cluster]],
+                                 dtype=object)
+        self.action_codes = np.array([r.action_code for r in records], dtype=object)
+        self.call_names = np.array([r.call_name for r in records], dtype=object)
+        self.contribution_min = np.array([np.nan if r.contribution_min is None else r.contribution_min for r in records])
+        self.contribution_max = np.array([np.nan if r.contribution_max is None else r.contribution_max for r in records])
+        self.indicative_budget = np.array([np.nan if r.indicative_budget is None else r.indicative_budget for r in records])
+        self.deadlines = np.array([r.deadline or "NaT" for r in records], dtype="datetime64[D]")
+
+    def action_counts(self):
+        """{abbreviation: number of calls} in TYPES_OF_ACTION order, Other last"""
+        codes, counts = np.unique(self.action_codes.astype(str), return_counts=True)
+        found = dict(zip(codes, counts.tolist()))
+        return {code: found[code] for code in list(TYPES_OF_ACTION) + [OTHER_TYPE] if code in found}
+
+    def filter(self, action_codes=None, min_budget=None, min_contribution=None, clusters=None):
+        """Set of paths matching every given condition (None or empty means no condition)"""
+        mask = np.ones(len(self.paths), dtype=bool)
+        if action_codes:
+            mask &= np.isin(self.action_codes, list(action_codes))
+        if min_budget:
+            mask &= self.indicative_budget >= min_budget
+        if min_contribution:
+            mask &= self.contribution_max >= min_contribution
+        if clusters:
+            mask &= np.isin(self.clusters, list(clusters))
+        return {self.paths[i] for i in np.flatnonzero(mask)}
+
+
+_table_cache = None  # CallMetadataTable of the current corpus signature
+_table_lock = threading.Lock()
+
+
+def get_metadata_table(corpus_index):
+    """Process-wide CallMetadataTable, rebuilt when the corpus signature changes"""
+    global _table_cache
+    with _table_lock:
+        if _table_cache is None or _table_cache.signature != corpus_index.signature:
+            _table_cache = CallMetadataTable(corpus_index)
+            # Forget extractions of file versions no longer in the corpus
+            live = {id(record) for record in _table_cache.records.values()}
+            with _extracted_lock:
+                for content_hash in [h for h, record in _extracted.items() if id(record) not in live]:
+                    del _extracted[content_hash]
+        return _table_cache
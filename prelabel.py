@@ -0,0 +1,155 @@
+"""Suggest labels for every call offline.
+
+    python prelabel.py [--root .] [--output label_suggestions.csv] [--workers N] [--threshold 8.0]
+
+Scores each call's Expected Outcome and Scope against the label keyword
+lists from highlight.py, weighting every keyword hit by its TF-IDF across the
+whole corpus, and writes one row per call to a sidecar CSV. The app shows the
+suggestions as pre-filled, unconfirmed labels.
+"""
+import os
+import sys
+import math
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from corpus import CLUSTERS, CallDocument, call_id_from_path, get_call_files
+from highlight import LabelHighlighter, load_label_keywords
+from labels import LABEL_COLS
+from search import tokenize
+
+SUGGESTIONS_FILE = "label_suggestions.csv"
+DEFAULT_THRESHOLD = 8.0
+
+_worker_highlighter = None
+
+
+def _init_worker(label_keywords):
+    global _worker_highlighter
+    _worker_highlighter = LabelHighlighter(label_keywords)
+
+
+def analyse_call(job):
+    """Worker: token counts and keyword hits of one call file's Expected Outcome and Scope"""
+    cluster, path = job
+    with open(path, "rb") as f:
+        document = CallDocument.from_bytes(call_id_from_path(path), f.read())
+    text = f"{document.expected_outcome}\n{document.scope}"
+    hits = {}
+    for start, end, label in _worker_highlighter.matches(text):
+        hits.setdefault(label, Counter())[" ".join(tokenize(text[start:end]))] += 1
+    return cluster, document.call_id, Counter(tokenize(text)), hits
+
+
+def score_calls(analyses):
+    """{call_id: {label: score}}: sum over matched keywords of (1 + log tf) * idf.
+
+    A keyword's idf is the mean idf of its tokens, so hits on words that
+    appear in most calls ("climate" in the climate cluster) count for little.
+    """
+    n_docs = len(analyses)
+    doc_freq = Counter()
+    for _, _, token_counts, _ in analyses:
+        doc_freq.update(token_counts.keys())
+    idf = {token: math.log((n_docs + 1) / (df + 1)) + 1 for token, df in doc_freq.items()}
+
+    scores = {}
+    for _, call_id, _, hits in analyses:
+        call_scores = {}
+        for label, keywords in hits.items():
+            score = 0.0
+            for keyword, count in keywords.items():
+                tokens = keyword.split()
+                if tokens:
+                    score += (1 + math.log(count)) * sum(idf.get(t, 1.0) for t in tokens) / len(tokens)
+            call_scores[label] = round(score, 3)
+        scores[call_id] = call_scores
+    return scores
+
+
+def build_suggestions(root_dir, clusters=CLUSTERS, workers=None, threshold=DEFAULT_THRESHOLD):
+    """DataFrame with CallID, Cluster, a yes/"" suggestion per label and <label>_score columns"""
+    final_output_dir = os.path.join(root_dir, "final_output_2")
+    jobs = [
+        (cluster, path)
+        for cluster in clusters
+        for path in sorted(get_call_files(os.path.join(final_output_dir, cluster)))
+    ]
+    label_keywords = load_label_keywords(root_dir)
+    if workers == 1:
+        _init_worker(label_keywords)
+        analyses = [analyse_call(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(label_keywords,)) as pool:
+            analyses = list(pool.map(analyse_call, jobs, chunksize=16))
+
+    scores = score_calls(analyses)
+    scored_labels = [label for label in LABEL_COLS if label != "none"]
+    rows = []
+    for cluster, call_id, _, _ in analyses:
+        call_scores = scores[call_id]
+        row = {"CallID": call_id, "Cluster": cluster}
+        for label in scored_labels:
+            row[label] = "yes" if call_scores.get(label, 0.0) >= threshold else ""
+        row["none"] = "" if any(row[label] for label in scored_labels) else "yes"
+        for label in scored_labels:
+            row[f"{label}_score"] = call_scores.get(label, 0.0)
+        rows.append(row)
+    columns = ["CallID", "Cluster"] + LABEL_COLS + [f"{label}_score" for label in scored_labels]
+    return pd.DataFrame(rows, columns=columns)
+
+
+_suggestions_cache = {}  # path -> ((mtime_ns, size), {call_id: {label: value}})
+_suggestions_lock = threading.Lock()
+
+
+def load_suggestions(csv_path):
+    """{CallID: {label: "yes"/""}} from a suggestions file, re-read only when it changes"""
+    try:
+        st = os.stat(csv_path)
+    except FileNotFoundError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _suggestions_lock:
+        cached = _suggestions_cache.get(csv_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        df = pd.read_csv(csv_path, usecols=lambda col: col in ["CallID"] + LABEL_COLS,
+                         dtype=str, keep_default_na=False, na_filter=False)
+        df = df.reindex(columns=["CallID"] + LABEL_COLS, fill_value="")
+        rows = zip(*(df[col].tolist() for col in LABEL_COLS))
+        suggestions = {call_id: dict(zip(LABEL_COLS, row)) for call_id, row in zip(df["CallID"].tolist(), rows)}
+        _suggestions_cache[csv_path] = (stamp, suggestions)
+        return suggestions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write suggested labels for every call to a sidecar CSV.")
+    parser.add_argument("--root", default=os.getcwd(), help="directory containing final_output_2 (default: cwd)")
+    parser.add_argument("--output", help=f"output CSV (default: <root>/{SUGGESTIONS_FILE})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count, 1 = no pool)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"minimum score for a label to be suggested (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--clusters", nargs="+", default=CLUSTERS, choices=CLUSTERS, help="clusters to label")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    df = build_suggestions(args.root, args.clusters, args.workers, args.threshold)
+    output = args.output or os.path.join(args.root, SUGGESTIONS_FILE)
+    tmp_path = output + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output)
+
+    elapsed = time.perf_counter() - started
+    counts = ", ".join(f"{label} {(df[label] == 'yes').sum()}" for label in LABEL_COLS)
+    print(f"Wrote suggestions for {len(df)} calls to {output} in {elapsed:.1f}s ({counts})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
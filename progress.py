@@ -0,0 +1,196 @@
+import pandas as pd
+
+from corpus import call_id_from_path
+from labels import LABEL_COLS
+
+LABELLED_MARK = "✅"
+UNLABELLED_MARK = "⬜"
+
+
+def is_labelled(labels):
+    """True when a call has at least one confirmed label"""
+    return bool(labels) and any(labels.get(col) == "yes" for col in LABEL_COLS)
+
+
+class ProgressOverview:
+    """Labelling progress of every cluster and destination.
+
+    Built in one pass over the cached corpus index and the in-memory labels,
+    so it never touches the disk. status[cluster] holds one bool per call in
+    page order and backs the status matrix.
+    """
+
+    def __init__(self, corpus_index, labels_dict):
+        self.clusters = list(corpus_index.clusters)
+        self.status = {}
+        self.cluster_counts = {}      # cluster -> {"Calls": n, "Labelled": n, label: n}
+        self.destination_counts = {}  # (cluster, destination) -> same
+        for cluster in self.clusters:
+            destinations = corpus_index.destinations[cluster]
+            status = []
+            cluster_counts = self.cluster_counts[cluster] = dict.fromkeys(["Calls", "Labelled"] + LABEL_COLS, 0)
+            for path in corpus_index.files[cluster]:
+                call_id = call_id_from_path(path)
+                labels = labels_dict.get(call_id)
+                labelled = is_labelled(labels)
+                status.append(labelled)
+                key = (cluster, destinations.get(call_id, ""))
+                destination_counts = self.destination_counts.get(key)
+                if destination_counts is None:
+                    destination_counts = self.destination_counts[key] = dict.fromkeys(cluster_counts, 0)
+                for counts in (cluster_counts, destination_counts):
+                    counts["Calls"] += 1
+                    if labelled:
+                        counts["Labelled"] += 1
+                        for label in LABEL_COLS:
+                            if labels.get(label) == "yes":
+                                counts[label] += 1
+            self.status[cluster] = status
+
+    def labelled(self, cluster):
+        return self.cluster_counts[cluster]["Labelled"]
+
+    def cluster_table(self):
+        """DataFrame: one row per cluster with labelled/unlabelled counts and per-label totals"""
+        rows = []
+        for cluster in self.clusters:
+            counts = self.cluster_counts[cluster]
+            rows.append({"Cluster": cluster, **counts, "Unlabelled": counts["Calls"] - counts["Labelled"]})
+        return pd.DataFrame(rows, columns=["Cluster", "Calls", "Labelled", "Unlabelled"] + LABEL_COLS)
+
+    def destination_table(self):
+        """DataFrame: the same counts per (cluster, destination)"""
+        rows = []
+        for (cluster, destination), counts in self.destination_counts.items():
+            rows.append({"Cluster": cluster, "Destination": destination or "(unknown)", **counts,
+                         "Unlabelled": counts["Calls"] - counts["Labelled"]})
+        return pd.DataFrame(rows, columns=["Cluster", "Destination", "Calls", "Labelled", "Unlabelled"] + LABEL_COLS)
+
+    def status_matrix(self):
+        """DataFrame with a row per cluster and a column per page position ("1", "2", ...)"""
+        width = max((len(status) for status in self.status.values()), default=0)
+        columns = [str(i + 1) for i in range(width)]
+        rows = []
+        for cluster in self.clusters:
+            marks = [LABELLED_MARK if labelled else UNLABELLED_MARK for labelled in self.status[cluster]]
+            rows.append(marks + [""] * (width - len(marks)))
+        return pd.DataFrame(rows, index=self.clusters, columns=columns)
+
+
+class PositionSet:
+    """Set of positions in range(size) kept in a Fenwick tree.
+
+    add(), discard() and next_after() each cost O(log size); membership is
+    a flag lookup and len() a counter.
+    """
+
+    __slots__ = ("flags", "tree", "count")
+
+    def __init__(self, size, positions=()):
+        self.flags = bytearray(size)
+        self.tree = [0] * (size + 1)  # 1-based partial sums of flags
+        self.count = 0
+        for position in positions:
+            self.flags[position] = 1
+            self.count += 1
+        # Linear-time build: push each node's sum up to its parent
+        for i in range(1, size + 1):
+            self.tree[i] += self.flags[i - 1]
+            parent = i + (i & -i)
+            if parent <= size:
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, position):
+        return bool(self.flags[position])
+
+    def _add(self, position, delta):
+        i = position + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def add(self, position):
+        if not self.flags[position]:
+            self.flags[position] = 1
+            self.count += 1
+            self._add(position, 1)
+
+    def discard(self, position):
+        if self.flags[position]:
+            self.flags[position] = 0
+            self.count -= 1
+            self._add(position, -1)
+
+    def rank(self, position):
+        """Number of positions <= position"""
+        total = 0
+        i = min(position + 1, len(self.tree) - 1)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def nth(self, k):
+        """The k-th smallest position (1-based), found by descending the tree"""
+        i = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            if i + step < len(self.tree) and self.tree[i + step] < k:
+                i += step
+                k -= self.tree[i]
+            step >>= 1
+        return i
+
+    def next_after(self, position=-1):
+        """First position after `position`, wrapping around; None if the set is empty"""
+        if not self.count:
+            return None
+        k = self.rank(position) if position >= 0 else 0
+        return self.nth(k + 1 if k < self.count else 1)
+
+
+class PendingCalls:
+    """Per cluster, the page positions of unlabelled calls as a PositionSet.
+
+    Built once per session and corpus signature; update() keeps it in step
+    with each save and next_after() finds the next unlabelled call, both in
+    O(log n) for a cluster of n calls.
+    """
+
+    def __init__(self, corpus_index, labels_dict):
+        self.signature = corpus_index.signature
+        self.pending = {}         # cluster -> PositionSet of unlabelled page positions
+        self.call_positions = {}  # call_id -> [(cluster, position), ...]
+        self.path_positions = {}  # path -> (cluster, position)
+        for cluster in corpus_index.clusters:
+            pending = []
+            for position, path in enumerate(corpus_index.files[cluster]):
+                call_id = call_id_from_path(path)
+                self.call_positions.setdefault(call_id, []).append((cluster, position))
+                self.path_positions[path] = (cluster, position)
+                if not is_labelled(labels_dict.get(call_id)):
+                    pending.append(position)
+            self.pending[cluster] = PositionSet(len(corpus_index.files[cluster]), pending)
+
+    def update(self, call_id, labels):
+        """Add or remove a call after its labels changed"""
+        labelled = is_labelled(labels)
+        for cluster, position in self.call_positions.get(call_id, ()):
+            if labelled:
+                self.pending[cluster].discard(position)
+            else:
+                self.pending[cluster].add(position)
+
+    def count(self, cluster, paths=None):
+        """Unlabelled calls in a cluster, or only among paths (calls of that cluster) when given"""
+        pending = self.pending[cluster]
+        if paths is None:
+            return len(pending)
+        return sum(1 for path in paths if self.path_positions[path][1] in pending)
+
+    def next_after(self, cluster, position=-1):
+        """Page position of the first unlabelled call after `position`, wrapping around; None if there is none"""
+        return self.pending[cluster].next_after(position)
@@ -0,0 +1,185 @@
+import os
+import re
+import math
+import pickle
+import threading
+from collections import defaultdict
+
+from corpus import call_id_from_path
+
+SEARCH_INDEX_FILE = ".search_index.pickle"  # Stored inside final_output_2
+SEARCH_INDEX_VERSION = 2
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def normalize_token(token):
+    """Fold simple English plurals so "models" matches "model" and "policies" matches "policy"."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lower-cased, plural-folded word tokens; the same tokeniser is used for documents and queries"""
+    return [normalize_token(token) for token in TOKEN_RE.findall(text.casefold())]
+
+
+def parse_query(query):
+    """Split a query into phrases (lists of tokens): quoted text is one phrase, other words one each"""
+    phrases = []
+    for quoted, word in QUERY_RE.findall(query):
+        tokens = tokenize(quoted if quoted else word)
+        if quoted and tokens:
+            phrases.append(tokens)
+        else:
+            phrases.extend([token] for token in tokens)
+    return phrases
+
+
+class SearchHit:
+    """One ranked search result"""
+
+    __slots__ = ("cluster", "call_id", "path", "score")
+
+    def __init__(self, cluster, call_id, path, score):
+        self.cluster = cluster
+        self.call_id = call_id
+        self.path = path
+        self.score = score
+
+    def __repr__(self):
+        return f"SearchHit({self.call_id!r}, score={self.score:.2f})"
+
+
+class SearchIndex:
+    """Positional inverted index over all call files with BM25 ranking.
+
+    postings maps a token to {doc: [positions]}; docs holds (cluster, path)
+    per document number. Quoted phrases must occur with consecutive
+    positions, plain words are OR-ed and everything is ranked with BM25.
+    """
+
+    def __init__(self, signature, docs, postings, lengths):
+        self.signature = signature
+        self.docs = docs
+        self.postings = postings
+        self.lengths = lengths
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, corpus_index):
+        docs = []
+        postings = defaultdict(dict)
+        lengths = []
+        for cluster in corpus_index.clusters:
+            for path in corpus_index.files[cluster]:
+                data = corpus_index.buffers.get(path)
+                if data is None:
+                    continue
+                doc = len(docs)
+                docs.append((cluster, path))
+                tokens = tokenize(str(data, "utf-8", "ignore"))
+                lengths.append(len(tokens))
+                for position, token in enumerate(tokens):
+                    postings[token].setdefault(doc, []).append(position)
+        return cls(corpus_index.signature, docs, dict(postings), lengths)
+
+    def _phrase_docs(self, tokens):
+        """{doc: number of occurrences} of a phrase"""
+        if len(tokens) == 1:
+            return {doc: len(positions) for doc, positions in self.postings.get(tokens[0], {}).items()}
+        lists = [self.postings.get(token) for token in tokens]
+        if not all(lists):
+            return {}
+        # Intersect on the rarest token first
+        candidates = set(min(lists, key=len))
+        for postings in lists:
+            candidates &= postings.keys()
+        matches = {}
+        for doc in candidates:
+            starts = set(lists[0][doc])
+            for offset, postings in enumerate(lists[1:], start=1):
+                starts &= {p - offset for p in postings[doc]}
+                if not starts:
+                    break
+            if starts:
+                matches[doc] = len(starts)
+        return matches
+
+    def search(self, query, limit=20, cluster=None):
+        """Ranked SearchHits for a query, optionally restricted to one cluster"""
+        phrases = parse_query(query)
+        if not phrases or not self.docs:
+            return []
+        n_docs = len(self.docs)
+        scores = defaultdict(float)
+        for tokens in phrases:
+            matches = self._phrase_docs(tokens)
+            if not matches:
+                continue
+            idf = math.log(1 + (n_docs - len(matches) + 0.5) / (len(matches) + 0.5))
+            # A phrase counts as one term whose weight grows with its length
+            idf *= len(tokens)
+            for doc, tf in matches.items():
+                norm = 1 - BM25_B + BM25_B * self.lengths[doc] / self.avg_length
+                scores[doc] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+        hits = []
+        for doc, score in sorted(scores.items(), key=lambda item: -item[1]):
+            doc_cluster, path = self.docs[doc]
+            if cluster is not None and doc_cluster != cluster:
+                continue
+            hits.append(SearchHit(doc_cluster, call_id_from_path(path), path, score))
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def save(self, file_path, root_dir):
+        # Paths are stored relative to the corpus root, which the signature does not cover
+        docs = [(cluster, os.path.relpath(path, root_dir)) for cluster, path in self.docs]
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((SEARCH_INDEX_VERSION, self.signature, docs, self.postings, self.lengths), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path, signature, root_dir):
+        """Saved index if it exists and was built for this corpus signature (manifest digest), else None"""
+        try:
+            with open(file_path, "rb") as f:
+                version, saved_signature, docs, postings, lengths = pickle.load(f)
+        except Exception:
+            return None
+        if version != SEARCH_INDEX_VERSION or saved_signature != signature:
+            return None
+        docs = [(cluster, os.path.join(root_dir, path)) for cluster, path in docs]
+        return cls(saved_signature, docs, postings, lengths)
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index(corpus_index):
+    """Process-wide SearchIndex for a CorpusIndex, loaded from disk or built and saved once"""
+    global _search_index
+    with _search_index_lock:
+        index = _search_index
+        if index is not None and index.signature == corpus_index.signature:
+            return index
+        file_path = os.path.join(corpus_index.root_dir, SEARCH_INDEX_FILE)
+        index = SearchIndex.load(file_path, corpus_index.signature, corpus_index.root_dir)
+        if index is None:
+            index = SearchIndex.build(corpus_index)
+            try:
+                index.save(file_path, corpus_index.root_dir)
+            except OSError:
+                pass
+        _search_index = index
+        return index
@@ -0,0 +1,147 @@
+"""Pack final_output_2 into one memory-mappable file.
+
+    python snapshot.py [--root final_output_2] [--output final_output_2.pack]
+
+The pack holds a fixed header, a small JSON table of contents, a table of
+fixed-size call records (blob offset, length and section offsets) and one
+blob with the UTF-8 call files and each cluster's parsed divide metadata.
+app.py maps it when it sits next to final_output_2, so a cold start opens
+one file instead of hundreds; the tree is still hashed in the background and
+used instead if it no longer matches the manifest digest stored in the pack.
+Re-run the tool after changing the tree.
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import argparse
+
+from corpus import (
+    CLUSTERS, HEADER_SECTION, SECTION_HEADINGS, DivideEntry, get_cluster_metadata, get_corpus_manifest,
+    get_divide_file_path, get_sorted_files, index_sections,
+)
+
+SNAPSHOT_FILE = "final_output_2.pack"  # Next to final_output_2
+SNAPSHOT_MAGIC = b"HECPACK\0"
+SNAPSHOT_VERSION = 1
+# magic, version, toc offset, toc length, records offset, record count, blob offset
+HEADER = struct.Struct("<8sIQQQQQ")
+HEADER_SIZE = 64
+# blob offset, length, then the start of each SECTION_HEADINGS section (NO_SECTION if absent)
+RECORD = struct.Struct("<QI" + "I" * len(SECTION_HEADINGS))
+NO_SECTION = 0xFFFFFFFF
+
+
+def build_snapshot(root_dir, output_path, clusters=CLUSTERS):
+    """Write the pack for root_dir; returns the number of calls packed"""
+    manifest = get_corpus_manifest(root_dir, clusters)
+    blob = bytearray()
+    records = []
+    toc = {"signature": manifest.digest, "clusters": {}}
+    for cluster in clusters:
+        cluster_dir = os.path.join(root_dir, cluster)
+        metadata = get_cluster_metadata(get_divide_file_path(root_dir, cluster))
+        txt_files = get_sorted_files(cluster_dir, cluster, root_dir, metadata.pages) if os.path.isdir(cluster_dir) else []
+        first_record = len(records)
+        paths = []
+        for path in txt_files:
+            with open(path, "rb") as f:
+                data = f.read()
+            starts = dict(index_sections(data))
+            records.append(RECORD.pack(len(blob), len(data), *(starts.get(name, NO_SECTION) for name, _ in SECTION_HEADINGS)))
+            blob += data
+            paths.append(os.path.relpath(path, root_dir).replace(os.sep, "/"))
+        meta = json.dumps({
+            "paths": paths,
+            "entries": [[e.call_id, e.title, e.destination, e.page, e.line_number] for e in metadata.entries],
+            "warnings": list(metadata.warnings),
+        }).encode("utf-8")
+        toc["clusters"][cluster] = {"meta": [len(blob), len(meta)], "records": [first_record, len(paths)]}
+        blob += meta
+
+    toc_bytes = json.dumps(toc).encode("utf-8")
+    records_offset = HEADER_SIZE + len(toc_bytes)
+    blob_offset = records_offset + RECORD.size * len(records)
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, HEADER_SIZE, len(toc_bytes), records_offset,
+                         len(records), blob_offset)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(toc_bytes)
+        f.write(b"".join(records))
+        f.write(blob)
+    os.replace(tmp_path, output_path)
+    return len(records)
+
+
+class CorpusSnapshot:
+    """Read-only view of a pack; call texts are memoryview slices of the mapping, never copied.
+
+    Opening it reads only the header and the table of contents; a
+    cluster's metadata is decoded when cluster() is asked for it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, toc_offset, toc_length, records_offset, record_count, blob_offset = HEADER.unpack_from(self._mmap)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} corpus snapshot")
+            self.view = memoryview(self._mmap)
+            toc = json.loads(str(self.view[toc_offset:toc_offset + toc_length], "utf-8"))
+        except (struct.error, ValueError):
+            self._mmap.close()
+            raise
+        self.signature = toc["signature"]
+        self.clusters = list(toc["clusters"])
+        self._toc = toc["clusters"]
+        self._records_offset = records_offset
+        self._blob_offset = blob_offset
+
+    def cluster(self, cluster):
+        """(divide entries, warnings, [(relative path, memoryview, sections), ...] in page order)"""
+        info = self._toc[cluster]
+        meta_offset, meta_length = info["meta"]
+        start = self._blob_offset + meta_offset
+        meta = json.loads(str(self.view[start:start + meta_length], "utf-8"))
+        entries = [DivideEntry(*row) for row in meta["entries"]]
+        first_record, count = info["records"]
+        calls = []
+        for i, path in enumerate(meta["paths"]):
+            offset, length, *starts = RECORD.unpack_from(self.view, self._records_offset + (first_record + i) * RECORD.size)
+            data = self.view[self._blob_offset + offset:self._blob_offset + offset + length]
+            sections = [(HEADER_SECTION, 0)] + sorted(
+                ((name, start) for (name, _), start in zip(SECTION_HEADINGS, starts) if start != NO_SECTION),
+                key=lambda section: section[1],
+            )
+            calls.append((path, data, sections))
+        return entries, meta["warnings"], calls
+
+    def close(self):
+        self.view.release()
+        self._mmap.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack final_output_2 into one memory-mappable snapshot.")
+    parser.add_argument("--root", default=os.path.join(os.getcwd(), "final_output_2"),
+                        help="corpus tree (default: ./final_output_2)")
+    parser.add_argument("--output", help=f"pack file (default: {SNAPSHOT_FILE} next to the tree)")
+    parser.add_argument("--clusters", nargs="+", default=CLUSTERS, choices=CLUSTERS, help="clusters to pack")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    root_dir = os.path.abspath(args.root)
+    output = args.output or os.path.join(os.path.dirname(root_dir), SNAPSHOT_FILE)
+    count = build_snapshot(root_dir, output, args.clusters)
+    size = os.path.getsize(output)
+    print(f"Packed {count} calls into {output} ({size / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())